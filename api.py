@@ -0,0 +1,121 @@
+"""Versioned JSON API (`/api/v1`) for machine clients such as the nightly
+compliance sync.
+
+    GET  /api/v1/schedules?active=1&after=<cursor>&per_page=500
+    POST /api/v1/schedules/bulk   {"upsert": [...], "deactivate": [...]}
+    GET  /api/v1/logs?status=FAILED&date_from=2025-01-01&after=<cursor>
+
+Reads are keyset-paginated (`next_cursor` goes back as `after=`) and carry a
+strong ETag that is a hash of the body, so it stays the same for the same
+data across cache expiry and workers; a client that sends it back in
+If-None-Match gets 304 without a body. The bulk endpoint applies the whole
+batch in one transaction (see `bulk.upsert_schedules`), or nothing with 422
+and the errors.
+"""
+import hashlib
+import json
+from flask import Blueprint, Flask, Response, request
+import cache
+from bulk import LOG_FIELDS, SCHEDULE_FIELDS, filter_logs, jsonable, log_export_query, log_filters, upsert_schedules
+from models import db, Schedule, ReminderLog
+from pagination import keyset_page
+
+# Largest page of a read and largest upsert + deactivate batch accepted.
+MAX_PAGE_SIZE = 1000
+MAX_BULK_ROWS = 10000
+
+_SCHEDULE_API_FIELDS = ("id",) + SCHEDULE_FIELDS + ("next_due_date", "updated_at")
+
+
+def _per_page() -> int:
+    return max(1, min(request.args.get("per_page", 100, type=int), MAX_PAGE_SIZE))
+
+
+def _json(payload, status: int = 200) -> Response:
+    return Response(json.dumps(payload, default=jsonable, ensure_ascii=False), status=status,
+                    mimetype="application/json")
+
+
+def _conditional_json(name: str, tables, args, compute) -> Response:
+    """Serve the (cached) JSON body of a read with its content ETag, or 304
+    when the client already has it."""
+    def body():
+        text = json.dumps(compute(), default=jsonable, ensure_ascii=False)
+        return text, hashlib.sha1(text.encode()).hexdigest()
+
+    (text, etag), _ = cache.cached(name, tables, args, body)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(text, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _page_payload(page, fields) -> dict:
+    return {
+        "items": [dict(zip(fields, row)) for row in page.items],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    }
+
+
+def list_schedules():
+    active = request.args.get("active", "").strip().lower()
+    per_page = _per_page()
+    after, before = request.args.get("after"), request.args.get("before")
+
+    def compute():
+        query = db.session.query(*(getattr(Schedule, f) for f in _SCHEDULE_API_FIELDS))
+        if active in ("1", "true", "yes"):
+            query = query.filter(Schedule.active.is_(True))
+        elif active in ("0", "false", "no"):
+            query = query.filter(Schedule.active.is_(False))
+        page = keyset_page(query, Schedule.id, Schedule.id, per_page, after=after, before=before)
+        return _page_payload(page, _SCHEDULE_API_FIELDS)
+
+    return _conditional_json("api_schedules", ("schedules",), (active, per_page, after, before), compute)
+
+
+def bulk_schedules():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return _json({"error": "expected a JSON object with upsert and/or deactivate lists"}, 400)
+    rows, deactivate = payload.get("upsert") or [], payload.get("deactivate") or []
+    if not isinstance(rows, list) or not isinstance(deactivate, list):
+        return _json({"error": "upsert and deactivate must be lists"}, 400)
+    if len(rows) + len(deactivate) > MAX_BULK_ROWS:
+        return _json({"error": f"at most {MAX_BULK_ROWS} rows per request"}, 400)
+    result = upsert_schedules(rows, deactivate)
+    return _json({
+        "inserted": result.inserted,
+        "updated": result.updated,
+        "unchanged": result.unchanged,
+        "deactivated": result.deactivated,
+        "not_found": [{"entity_name": e, "report_name": r} for e, r in result.not_found],
+        "errors": [{"section": s, "index": i, "message": m} for s, i, m in result.errors],
+    }, 422 if result.errors else 200)
+
+
+def list_logs():
+    filters = log_filters(request.args)
+    per_page = _per_page()
+    after, before = request.args.get("after"), request.args.get("before")
+
+    def compute():
+        query = log_export_query(filter_logs(**filters)).order_by(None)
+        page = keyset_page(query, ReminderLog.sent_at, ReminderLog.id, per_page,
+                           after=after, before=before, descending=True)
+        return _page_payload(page, LOG_FIELDS)
+
+    return _conditional_json("api_logs", ("reminder_logs", "schedules"),
+                             (sorted(filters.items()), per_page, after, before), compute)
+
+
+def register_api(app: Flask):
+    api = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+    api.add_url_rule("/schedules", view_func=list_schedules, methods=["GET"])
+    api.add_url_rule("/schedules/bulk", view_func=bulk_schedules, methods=["POST"])
+    api.add_url_rule("/logs", view_func=list_logs, methods=["GET"])
+    app.register_blueprint(api)
@@ -1,63 +1,232 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+import io
+from types import SimpleNamespace
+from flask import (
+    Flask, Response, render_template, request, redirect, url_for, flash, stream_with_context, session,
+    make_response,
+)
 from markupsafe import escape
 from config import Config
-from models import db, Schedule, ReminderLog
+from models import db, Schedule, ReminderLog, PlannedReminder, JobRun
 from scheduler import init_scheduler
+from migrations import upgrade_schema
+import metrics
+import cache
 from datetime import datetime, date, timedelta
-from utils import parse_offsets, parse_csv_emails, next_occurrence
+from utils import next_occurrence, parse_csv_emails
 from mailer import send_email
-import pytz
+from planner import (
+    refresh_schedule_plan, drop_schedule_plan, get_tz, local_time, local_today, schedule_timezones,
+    schedule_tz,
+)
+from pagination import Page, keyset_page
+from recipients import drop_recipients, has_valid_recipient, sync_schedule
+from runs import abandon_dead_runs, duration_trends
+from retention import archive_page, archived_months, export_archive, monthly_totals
+from forecast import MAX_FORECAST_DAYS, as_dict as forecast_summary, forecast
+from api import register_api
+from bulk import detect_format, export_logs, export_schedules, filter_logs, import_schedules, log_filters
+from sqlalchemy.orm import joinedload
 
-def create_app():
+def create_app(start_scheduler: bool = False):
+    """Build the app. The scheduler is opt-in: web workers, the outbox worker
+    and scripts get a plain app; the scheduler's catch-up scans run in the
+    background and never delay the first request."""
     app = Flask(__name__)
     app.config.from_object(Config)
     db.init_app(app)
+    app.extensions["startup_status"] = {"scheduler": "disabled", "catch_up": "disabled"}
 
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        if metrics.enabled():
+            metrics.instrument_engine(db.engine)
 
-    init_scheduler(app)
+    app.add_template_filter(local_time)
+    cache.track_writes(db.session)
     register_routes(app)
+    register_api(app)
+    if start_scheduler:
+        init_scheduler(app)
     return app
 
+_SCHEDULE_VIEW_FIELDS = (
+    "id", "entity_name", "report_name", "anchor_due_date", "interval_months", "recipient_emails",
+    "reminder_offsets_days", "timezone", "active", "next_due_date",
+)
+NO_VALID_RECIPIENT = "Field 'To' needs at least one valid email address"
+_LOG_VIEW_FIELDS = (
+    "id", "schedule_id", "status", "planned_due_date", "reminder_offset_days", "sent_at", "backfilled",
+    "error_message",
+)
+
+def _log_view(log):
+    return cache.snapshot(log, _LOG_VIEW_FIELDS, schedule=cache.snapshot(
+        log.schedule, ("entity_name", "report_name", "timezone")))
+
+def _conditional(etag, render):
+    """Render a cached page with its ETag, or answer 304 when the client
+    already has it. Pages with a pending flash message are never 304'd."""
+    if etag is None or session.get("_flashes"):
+        return render()
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = make_response(render())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def _current_due(schedule):
+    today = local_today(schedule_tz(schedule))
+    if schedule.next_due_date is not None and schedule.next_due_date >= today:
+        return schedule.next_due_date
+    return next_occurrence(schedule.anchor_due_date, schedule.interval_months, today)
+
+def _archived_view(row):
+    return SimpleNamespace(
+        **{f: row.get(f) for f in _LOG_VIEW_FIELDS if f not in ("sent_at", "planned_due_date")},
+        sent_at=datetime.fromisoformat(row["sent_at"]),
+        planned_due_date=date.fromisoformat(row["planned_due_date"]),
+        schedule=SimpleNamespace(entity_name=row["entity_name"], report_name=row["report_name"], timezone=None),
+    )
+
+def _archived_logs(month, filters):
+    """/logs for an archived month: the gzip file is streamed and filtered,
+    a page at a time; the cursor is the archive line to continue after."""
+    rows, next_line = archive_page(
+        month, _page_size(), after_line=request.args.get("after", 0, type=int), **filters)
+    page = Page([_archived_view(row) for row in rows], str(next_line) if next_line else None, None)
+    args = {k: v for k, v in filters.items() if v}
+    args["archive"] = month
+    if "per_page" in request.args:
+        args["per_page"] = _page_size()
+    return render_template("logs.html", logs=page.items, page=page, filters=filters, args=args,
+                           months=archived_months(), archive=month)
+
+def _form_timezone(form):
+    tz = form.get("timezone", "").strip()
+    return tz if tz in schedule_timezones() else None
+
+def _timezone_choices():
+    """[(zone, current abbreviation)] for the schedule form, e.g. WIB/WITA/WIT."""
+    return [(tz, datetime.now(get_tz(tz)).strftime("%Z")) for tz in schedule_timezones()]
+
+def _page_size():
+    return max(1, min(request.args.get("per_page", Config.PAGE_SIZE, type=int), 200))
+
+def _filtered_logs():
+    """The /logs filters from the query string and the ReminderLog query they select."""
+    filters = log_filters(request.args)
+    return filters, filter_logs(**filters)
+
+def _download(chunks, name: str, fmt: str):
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"},
+    )
+
 def register_routes(app: Flask):
+    @app.route("/healthz")
+    def healthz():
+        return {"status": "ok"}
+
+    @app.route("/readyz")
+    def readyz():
+        # Ready as soon as the database answers; the background scheduler's
+        # catch-up progress is reported, not waited for.
+        status = dict(app.extensions["startup_status"])
+        try:
+            db.session.execute(db.text("SELECT 1"))
+            status["database"] = "ok"
+            code = 200
+        except Exception as e:
+            status["database"] = f"error: {e}"
+            code = 503
+        for key in ("catch_up_started_at", "catch_up_finished_at"):
+            if status.get(key):
+                status[key] = status[key].isoformat() + "Z"
+        status["ready"] = code == 200
+        return status, code
+
+    @app.route("/metrics")
+    def metrics_view():
+        if not metrics.enabled():
+            return "Metrics are disabled (METRICS_ENABLED=false)", 404
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
     @app.route("/")
     def index():
-        # Show upcoming dues and counts
-        tz = pytz.timezone(Config.APP_TZ)
-        today = datetime.now(tz).date()
-        schedules = Schedule.query.filter_by(active=True).all()
-        rows = []
-        for s in schedules:
-            due = next_occurrence(s.anchor_due_date, s.interval_months, today)
-            offsets = parse_offsets(s.reminder_offsets_days) if s.reminder_offsets_days else Config.DEFAULT_REMINDER_OFFSETS
-            rows.append({
-                "schedule": s,
-                "next_due": due,
-                "offsets": offsets,
-            })
-        # Recent logs
-        recent_logs = ReminderLog.query.order_by(ReminderLog.sent_at.desc()).limit(50).all()
-        return render_template("index.html", rows=rows, logs=recent_logs, today=today)
+        # Upcoming dues, one keyset page at a time, from the stored next_due_date
+        today = local_today()
+        sort = request.args.get("sort", "due")
+        if sort != "entity":
+            sort = "due"
+
+        def compute():
+            # next_due_date is advanced by the daily job, not on this read path;
+            # a date that went stale since is corrected for display only.
+            query = Schedule.query.filter(Schedule.active.is_(True))
+            if sort == "entity":
+                sort_col = Schedule.entity_name
+            else:
+                sort_col = Schedule.next_due_date
+                query = query.filter(Schedule.next_due_date.isnot(None))
+            page = keyset_page(
+                query, sort_col, Schedule.id, _page_size(),
+                after=request.args.get("after"), before=request.args.get("before"),
+            )
+            rows = []
+            for s in page.items:
+                rows.append({
+                    "schedule": cache.snapshot(s, _SCHEDULE_VIEW_FIELDS),
+                    "next_due": _current_due(s),
+                    "offsets": s.offsets or Config.DEFAULT_REMINDER_OFFSETS,
+                })
+            # Recent logs
+            recent_logs = (
+                ReminderLog.query.options(joinedload(ReminderLog.schedule))
+                .order_by(ReminderLog.sent_at.desc(), ReminderLog.id.desc())
+                .limit(50)
+                .all()
+            )
+            return rows, page._replace(items=[]), [_log_view(l) for l in recent_logs], monthly_totals()
+
+        (rows, page, recent_logs, archived), etag = cache.cached(
+            "index", ("schedules", "reminder_logs", "reminder_log_rollups"),
+            (today, sort, request.args.get("after"), request.args.get("before"), _page_size()), compute,
+        )
+        args = {"sort": sort}
+        if "per_page" in request.args:
+            args["per_page"] = _page_size()
+        return _conditional(etag, lambda: render_template(
+            "index.html", rows=rows, page=page, args=args, sort=sort, logs=recent_logs, archived=archived,
+            today=today))
 
     @app.route("/send-today", methods=["POST"])
     def send_today():
         from scheduler import send_today_due_reminders
         send_today_due_reminders()
-        flash("Reminders for today dispatched", "success")
+        flash("Reminders for today queued for sending", "success")
         return redirect(url_for("index"))
 
     @app.route("/scan-missed", methods=["POST"])
     def scan_missed():
         from scheduler import scan_missed_reminders
         scan_missed_reminders()
-        flash("Missed reminders backfilled", "success")
+        flash("Missed reminders queued for sending", "success")
         return redirect(url_for("index"))
 
     @app.route("/schedules")
     def list_schedules():
-        schedules = Schedule.query.order_by(Schedule.entity_name, Schedule.report_name).all()
-        return render_template("schedules.html", schedules=schedules)
+        def compute():
+            schedules = Schedule.query.order_by(Schedule.entity_name, Schedule.report_name).all()
+            return [cache.snapshot(s, _SCHEDULE_VIEW_FIELDS) for s in schedules]
+
+        schedules, etag = cache.cached("schedules", ("schedules",), (), compute)
+        return _conditional(etag, lambda: render_template("schedules.html", schedules=schedules))
 
     @app.route("/schedules/new", methods=["GET", "POST"])
     def new_schedule():
@@ -72,13 +241,19 @@ def register_routes(app: Flask):
                 recipient_emails=form.get("recipient_emails","").strip(),
                 cc_emails=form.get("cc_emails","").strip() or None,
                 reminder_offsets_days=form.get("reminder_offsets_days","").strip() or None,
+                timezone=_form_timezone(form),
                 active=True if form.get("active")=="on" else False
             )
+            if not has_valid_recipient(s.recipient_emails):
+                flash(NO_VALID_RECIPIENT, "danger")
+                return render_template("schedule_form.html", schedule=s, timezones=_timezone_choices()), 422
             db.session.add(s)
+            sync_schedule(s)
             db.session.commit()
+            refresh_schedule_plan(s)
             flash("Schedule created", "success")
             return redirect(url_for("list_schedules"))
-        return render_template("schedule_form.html", schedule=None)
+        return render_template("schedule_form.html", schedule=None, timezones=_timezone_choices())
 
     @app.route("/schedules/<int:sid>/edit", methods=["GET", "POST"])
     def edit_schedule(sid):
@@ -93,24 +268,137 @@ def register_routes(app: Flask):
             s.recipient_emails=form.get("recipient_emails","").strip()
             s.cc_emails=form.get("cc_emails","").strip() or None
             s.reminder_offsets_days=form.get("reminder_offsets_days","").strip() or None
+            s.timezone=_form_timezone(form)
             s.active=True if form.get("active")=="on" else False
+            if not has_valid_recipient(s.recipient_emails):
+                db.session.expunge(s)
+                flash(NO_VALID_RECIPIENT, "danger")
+                return render_template("schedule_form.html", schedule=s, timezones=_timezone_choices()), 422
+            sync_schedule(s)
             db.session.commit()
+            refresh_schedule_plan(s)
             flash("Schedule updated", "success")
             return redirect(url_for("list_schedules"))
-        return render_template("schedule_form.html", schedule=s)
+        return render_template("schedule_form.html", schedule=s, timezones=_timezone_choices())
 
     @app.route("/schedules/<int:sid>/delete", methods=["POST"])
     def delete_schedule(sid):
         s = Schedule.query.get_or_404(sid)
+        drop_schedule_plan(s.id)
+        drop_recipients(s.id)
         db.session.delete(s)
         db.session.commit()
         flash("Schedule deleted", "info")
         return redirect(url_for("list_schedules"))
 
+    @app.route("/schedules/import", methods=["GET", "POST"])
+    def import_schedules_view():
+        result = None
+        if request.method == "POST":
+            upload = request.files.get("file")
+            if not upload or not upload.filename:
+                flash("Pilih file CSV atau JSONL", "danger")
+            else:
+                fmt = request.form.get("format") or detect_format(upload.filename)
+                stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+                result = import_schedules(stream, fmt)
+                flash(f"{result.inserted} schedule diimpor, {result.error_count} baris ditolak",
+                      "success" if not result.error_count else "warning")
+        return render_template("schedule_import.html", result=result)
+
+    @app.route("/schedules/export.<fmt>")
+    def export_schedules_view(fmt):
+        if fmt not in ("csv", "jsonl"):
+            return "Unsupported format", 404
+        return _download(export_schedules(fmt), "schedules", fmt)
+
+    @app.route("/logs/export.<fmt>")
+    def export_logs_view(fmt):
+        if fmt not in ("csv", "jsonl"):
+            return "Unsupported format", 404
+        filters, query = _filtered_logs()
+        month = request.args.get("archive", "")
+        if month in archived_months():
+            return _download(export_archive(month, fmt, **filters), f"reminder_logs-{month}", fmt)
+        return _download(export_logs(fmt, query), "reminder_logs", fmt)
+
+    @app.route("/upcoming")
+    def upcoming():
+        # Planned sends for the next N days, straight from the send plan
+        today = local_today()
+        days = min(request.args.get("days", 7, type=int), Config.PLAN_HORIZON_DAYS)
+        planned = (
+            PlannedReminder.query
+            .options(joinedload(PlannedReminder.schedule))
+            .filter(PlannedReminder.send_date.between(today, today + timedelta(days=days)))
+            .order_by(PlannedReminder.send_date, PlannedReminder.schedule_id, PlannedReminder.due_date)
+            .all()
+        )
+        return render_template("upcoming.html", planned=planned, today=today, days=days)
+
+    @app.route("/forecast")
+    def forecast_view():
+        # Projected volume as JSON: ?start=YYYY-MM-DD&days=N&top=N
+        try:
+            start = datetime.strptime(request.args["start"], "%Y-%m-%d").date() if request.args.get("start") else local_today()
+        except ValueError:
+            return {"error": "start must be YYYY-MM-DD"}, 400
+        days = max(1, min(request.args.get("days", 90, type=int), MAX_FORECAST_DAYS))
+        top = max(1, min(request.args.get("top", 10, type=int), 100))
+
+        def compute():
+            return forecast_summary(forecast(start, start + timedelta(days=days - 1)), top)
+
+        summary, etag = cache.cached("forecast", ("schedules",), (start, days, top), compute)
+        return _conditional(etag, lambda: summary)
+
+    @app.route("/runs")
+    def view_runs():
+        # Run ledger, newest first, with per-job daily duration trends
+        abandon_dead_runs()
+        db.session.commit()
+        job = request.args.get("job", "").strip() or None
+        query = JobRun.query
+        if job:
+            query = query.filter(JobRun.job == job)
+        page = keyset_page(
+            query, JobRun.started_at, JobRun.id, _page_size(),
+            after=request.args.get("after"), before=request.args.get("before"), descending=True,
+        )
+        trends = duration_trends(request.args.get("days", 30, type=int))
+        jobs = [j for (j,) in db.session.query(JobRun.job).distinct().order_by(JobRun.job)]
+        args = {"job": job} if job else {}
+        return render_template("runs.html", page=page, runs=page.items, trends=trends, jobs=jobs, job=job,
+                               args=args)
+
     @app.route("/logs")
     def view_logs():
-        logs = ReminderLog.query.order_by(ReminderLog.sent_at.desc()).limit(200).all()
-        return render_template("logs.html", logs=logs)
+        # Newest first, keyset-paginated on (sent_at, id) with optional filters
+        filters, query = _filtered_logs()
+        month = request.args.get("archive", "")
+        if month in archived_months():
+            return _archived_logs(month, filters)
+
+        def compute():
+            page = keyset_page(
+                query.options(joinedload(ReminderLog.schedule)), ReminderLog.sent_at, ReminderLog.id, _page_size(),
+                after=request.args.get("after"), before=request.args.get("before"),
+                descending=True,
+            )
+            return page._replace(items=[_log_view(l) for l in page.items])
+
+        page, etag = cache.cached(
+            "logs", ("reminder_logs", "schedules"),
+            (tuple(sorted(filters.items(), key=lambda kv: kv[0])), request.args.get("after"),
+             request.args.get("before"), _page_size()),
+            compute,
+        )
+        args = {k: v for k, v in filters.items() if v}
+        if "per_page" in request.args:
+            args["per_page"] = _page_size()
+        return _conditional(etag, lambda: render_template(
+            "logs.html", logs=page.items, page=page, filters=filters, args=args, months=archived_months(),
+            archive=""))
 
     @app.route("/test-email", methods=["GET", "POST"])
     def test_email():
@@ -128,7 +416,17 @@ def register_routes(app: Flask):
                     flash(f"Gagal mengirim email: {err}", "danger")
         return render_template("test_email.html")
 
-app = create_app()
+_app = None
+
+def __getattr__(name):
+    # `app` is built on first access (gunicorn app:app, seed_demo.py), not at
+    # import time, so importing this module for create_app() stays cheap.
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app(start_scheduler=Config.SCHEDULER_ENABLED)
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    create_app(start_scheduler=Config.SCHEDULER_ENABLED).run(debug=True, host="0.0.0.0", port=5000)
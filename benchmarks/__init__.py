@@ -0,0 +1,5 @@
+"""Performance benchmarks. Run modules with `python -m benchmarks.<name>`.
+
+`run` is the scenario suite (generated data, stub SMTP relay, JSON results);
+the `bench_*` modules are focused micro-benchmarks for single components.
+"""
@@ -0,0 +1,43 @@
+"""Dispatch throughput vs. worker count against a stub relay with latency.
+
+    python -m benchmarks.bench_dispatch --messages 200 --latency-ms 20
+"""
+import argparse
+import time
+
+import mailer
+from benchmarks.bench_smtp_pool import _PlainPool
+from benchmarks.smtp_stub import StubSMTPServer
+from config import Config
+from dispatcher import OutgoingEmail, dispatch
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--latency-ms", type=float, default=20.0)
+    ap.add_argument("--workers", default="1,2,4,8,16")
+    ap.add_argument("--rate", type=float, default=0.0, help="per-host msg/s limit (0 = off)")
+    args = ap.parse_args()
+
+    Config.EMAIL_DRY_RUN = False
+    Config.SMTP_HOST = "127.0.0.1"
+    Config.SMTP_RATE_PER_SECOND = args.rate
+    emails = [
+        OutgoingEmail(i, [], [], [f"pic{i}@example.com"], f"Reminder {i}", "<p>hi</p>", "hi")
+        for i in range(args.messages)
+    ]
+    for workers in (int(w) for w in args.workers.split(",")):
+        with StubSMTPServer(command_latency=args.latency_ms / 1000) as srv:
+            Config.SMTP_PORT = srv.port
+            mailer._pool = _PlainPool("127.0.0.1", srv.port, max_size=workers)
+            start = time.perf_counter()
+            results = dispatch(emails, workers=workers)
+            elapsed = time.perf_counter() - start
+            mailer.close_smtp_pool()
+        ok = sum(r.ok for r in results)
+        print(f"workers={workers:3d} {args.messages / elapsed:8.1f} msg/s  ok={ok}/{len(results)}")
+
+
+if __name__ == "__main__":
+    main()
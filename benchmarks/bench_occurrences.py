@@ -0,0 +1,73 @@
+"""Closed-form occurrence arithmetic vs. the old step-by-step walk.
+
+Checks the closed form against the old loop on random schedules, checks the
+month-end invariants the loop got wrong, then times both.
+
+    python -m benchmarks.bench_occurrences --cases 20000
+"""
+import argparse
+import calendar
+import random
+import timeit
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+
+from utils import next_occurrence, occurrences_between, previous_occurrence
+
+
+def legacy_next_occurrence(anchor, interval_months, ref):
+    if interval_months == 0:
+        return anchor if anchor >= ref else None
+    due = anchor
+    while due < ref:
+        due = due + relativedelta(months=interval_months)
+    return due
+
+
+def _random_case(rng, max_day):
+    year, month = rng.randint(2000, 2030), rng.randint(1, 12)
+    day = min(rng.randint(1, max_day), calendar.monthrange(year, month)[1])
+    anchor = date(year, month, day)
+    interval = rng.choice((0, 1, 2, 3, 6, 12, 24))
+    ref = anchor + timedelta(days=rng.randint(-400, 365 * 15))
+    return anchor, interval, ref
+
+
+def check(cases: int, seed: int = 0):
+    rng = random.Random(seed)
+    # Days <= 28 never clamp, so the old walk is a correct oracle there.
+    for _ in range(cases):
+        anchor, interval, ref = _random_case(rng, 28)
+        assert next_occurrence(anchor, interval, ref) == legacy_next_occurrence(anchor, interval, ref), (anchor, interval, ref)
+
+    for _ in range(cases):
+        anchor, interval, ref = _random_case(rng, 31)
+        nxt = next_occurrence(anchor, interval, ref)
+        prev = previous_occurrence(anchor, interval, ref)
+        assert nxt is None or nxt >= ref
+        assert prev is None or prev < ref
+        if interval:
+            assert nxt is not None
+            # Every occurrence keeps the anchor day unless the month is shorter.
+            last = calendar.monthrange(nxt.year, nxt.month)[1]
+            assert nxt.day == min(anchor.day, last), (anchor, interval, ref, nxt)
+            if prev is not None:
+                assert occurrences_between(anchor, interval, prev, nxt) == [prev, nxt]
+    print(f"check ok ({2 * cases} cases)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", type=int, default=20000)
+    args = ap.parse_args()
+    check(args.cases)
+
+    anchor, ref = date(2005, 1, 31), date(2026, 10, 18)
+    for name, fn in (("legacy walk", legacy_next_occurrence), ("closed form", next_occurrence)):
+        per_call = min(timeit.repeat(lambda: fn(anchor, 1, ref), number=200, repeat=5)) / 200
+        print(f"{name:12s} {per_call * 1e6:8.1f} us/call  (monthly, anchor 21 years back)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Daily scan cost with per-candidate dedup lookups vs. the batched planner.
+
+Seeds N schedules whose offsets all land on today, then runs the legacy
+per-candidate loop and the current `scan_and_send_reminders` (which only
+enqueues; sending is the outbox worker's job) and
+prints statement count and wall clock for each. The batched run starts from
+an empty plan, so it includes building planned_reminders.
+
+    python -m benchmarks.bench_planning --schedules 10000
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+import pytz
+from dateutil.relativedelta import relativedelta
+
+from benchmarks.common import QueryCounter, make_app, timed
+from config import Config
+from models import db, Schedule, ReminderLog
+from planner import schedule_offsets
+from recipients import backfill
+from utils import next_occurrence, previous_occurrence, should_send_for_due
+import scheduler
+
+
+def seed(n: int, today: date):
+    rows = []
+    for i in range(n):
+        offset = (7, 3, 1, 0)[i % 4]
+        interval = (1, 3, 12)[i % 3]
+        due = today + timedelta(days=offset)
+        rows.append(dict(
+            entity_name=f"Entity {i}",
+            report_name=f"Report {i % 50}",
+            anchor_due_date=due - relativedelta(months=interval * (i % 5)),
+            interval_months=interval,
+            recipient_emails=f"pic{i}@example.com",
+            reminder_offsets_days="7,3,1,0",
+            active=True,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        ))
+    db.session.execute(db.insert(Schedule), rows)
+    backfill(db.session)
+    db.session.commit()
+
+
+def _candidates_today(sch, today: date):
+    offsets = schedule_offsets(sch)
+    dues = {
+        next_occurrence(sch.anchor_due_date, sch.interval_months, today),
+        previous_occurrence(sch.anchor_due_date, sch.interval_months, today),
+    }
+    for due in sorted(d for d in dues if d):
+        for off in should_send_for_due(due, today, offsets):
+            yield due, off
+
+
+def legacy_scan(today: date):
+    """The pre-batching loop: one dedup SELECT and one COMMIT per candidate."""
+    for sch in Schedule.query.filter_by(active=True).all():
+        for due, off in _candidates_today(sch, today):
+            exists = ReminderLog.query.filter_by(
+                schedule_id=sch.id, planned_due_date=due,
+                reminder_offset_days=off, status="SENT",
+            ).filter(ReminderLog.sent_at >= datetime.combine(today, datetime.min.time())).first()
+            if exists:
+                continue
+            subject, html, text = scheduler.build_email_content(sch, due, off)
+            db.session.add(ReminderLog(
+                schedule_id=sch.id, planned_due_date=due, reminder_offset_days=off,
+                status="SENT", retry_count=0,
+            ))
+            db.session.commit()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--schedules", type=int, default=10000)
+    args = ap.parse_args()
+
+    Config.EMAIL_DRY_RUN = True
+    today = datetime.now(pytz.timezone(Config.APP_TZ)).date()
+    for label, run in (("legacy", legacy_scan), ("batched", None)):
+        app = make_app()
+        with app.app_context():
+            seed(args.schedules, today)
+            db.session.expunge_all()
+            results = {}
+            with QueryCounter(db.engine) as qc, timed(results, "seconds"):
+                if run is None:
+                    scheduler.scan_and_send_reminders()
+                else:
+                    run(today)
+            logs = ReminderLog.query.count()
+        print(f"{label:8s} {results['seconds']:7.2f}s  {qc.count:6d} statements  {logs} logs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Cached template rendering + prebuilt MIME vs. per-send f-strings + MIMEMultipart.
+
+Renders the same reminder the way a retry or a repeated scan would and
+times the content and the wire message separately.
+
+    python -m benchmarks.bench_rendering
+"""
+import timeit
+from datetime import date, datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from types import SimpleNamespace
+
+from config import Config
+from email_templates import reminder_label, render_reminder
+from mailer import build_message
+
+
+def legacy_content(schedule, due_date, offset_days):
+    h_text = reminder_label(offset_days)
+    subject = f"[Reminder {h_text}] {schedule.report_name} - {schedule.entity_name} (Due {due_date:%d %b %Y})"
+    html = f"""
+    <p>Yth. PIC <b>{schedule.entity_name}</b>,</p>
+    <p>Ini adalah pengingat <b>{h_text}</b> untuk penyampaian laporan <b>{schedule.report_name}</b>.</p>
+    <ul>
+      <li><b>Entitas</b>: {schedule.entity_name}</li>
+      <li><b>Laporan</b>: {schedule.report_name}</li>
+      <li><b>Jatuh tempo</b>: {due_date:%A, %d %B %Y}</li>
+    </ul>
+    <p>{schedule.description or ''}</p>
+    <p>Mohon tindak lanjut sesuai ketentuan. Terima kasih.</p>
+    <hr>
+    <p><i>Pesan ini dikirim otomatis oleh sistem reminder.</i></p>
+    """
+    text = f"""Reminder {h_text} untuk {schedule.report_name} - {schedule.entity_name}
+Jatuh tempo: {due_date:%A, %d %B %Y}
+{schedule.description or ''}
+Pesan ini dikirim otomatis oleh sistem reminder.
+"""
+    return subject, html, text
+
+
+def legacy_message(to_emails, cc_emails, subject, html_body, text_body):
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = f"{Config.SENDER_NAME} <{Config.SENDER_EMAIL}>"
+    msg["To"] = ", ".join(to_emails) if to_emails else Config.SENDER_EMAIL
+    if cc_emails:
+        msg["Cc"] = ", ".join(cc_emails)
+    msg.attach(MIMEText(text_body or "", "plain"))
+    msg.attach(MIMEText(html_body, "html"))
+    return msg.as_string()
+
+
+def main():
+    schedule = SimpleNamespace(
+        id=1, updated_at=datetime(2026, 1, 1), entity_name="PT Bank Contoh",
+        report_name="Laporan Bulanan", description="Disampaikan melalui portal.",
+    )
+    due, cc = date(2026, 10, 31), ["pic@example.com"]
+    content = render_reminder(schedule, due, 3)
+
+    cases = (
+        ("content  f-string", lambda: legacy_content(schedule, due, 3)),
+        ("content  cached", lambda: render_reminder(schedule, due, 3)),
+        ("message  MIMEMultipart", lambda: legacy_message([], cc, *content)),
+        ("message  prebuilt", lambda: build_message([], cc, *content)),
+    )
+    for name, fn in cases:
+        per_call = min(timeit.repeat(fn, number=2000, repeat=5)) / 2000
+        print(f"{name:24s} {per_call * 1e6:8.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Messages/sec with one connection per message vs. the pooled mailer.
+
+    python -m benchmarks.bench_smtp_pool --messages 200 --handshake-ms 50
+"""
+import argparse
+import smtplib
+import time
+
+from benchmarks.smtp_stub import StubSMTPServer
+from mailer import SMTPConnectionPool
+
+MESSAGE = "Subject: bench\r\n\r\nhello\r\n"
+
+
+class _PlainPool(SMTPConnectionPool):
+    # The stub has no TLS; keep the pool logic, skip STARTTLS/SSL.
+    def _connect(self):
+        from mailer import _PooledConnection
+
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        return _PooledConnection(server)
+
+
+def per_message(port: int, n: int):
+    for _ in range(n):
+        server = smtplib.SMTP("127.0.0.1", port)
+        server.ehlo()
+        server.sendmail("bench@example.com", ["rcpt@example.com"], MESSAGE)
+        server.quit()
+
+
+def pooled(port: int, n: int):
+    pool = _PlainPool("127.0.0.1", port, max_size=1, max_messages=100)
+    for _ in range(n):
+        pool.sendmail("bench@example.com", ["rcpt@example.com"], MESSAGE)
+    pool.close_all()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=200)
+    ap.add_argument("--handshake-ms", type=float, default=50.0)
+    args = ap.parse_args()
+
+    for label, fn in (("per-message", per_message), ("pooled", pooled)):
+        with StubSMTPServer(handshake_latency=args.handshake_ms / 1000) as srv:
+            start = time.perf_counter()
+            fn(srv.port, args.messages)
+            elapsed = time.perf_counter() - start
+            print(f"{label:12s} {args.messages / elapsed:8.1f} msg/s  "
+                  f"({srv.connections} connections, {srv.messages} delivered)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Import-to-first-request latency of the web app.
+
+Seeds a database with N schedules (empty plan, so the catch-up scans have
+real work), then times in a fresh interpreter: importing `app`, building the
+app with the scheduler on, and serving GET /readyz. Catch-up runs in the
+background, so its duration is reported separately from /readyz.
+
+    python -m benchmarks.bench_startup --schedules 5000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import pytz
+
+from benchmarks.common import make_app
+from config import Config
+
+_PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+t_import = time.perf_counter()
+app = app_module.create_app(start_scheduler=True)
+t_create = time.perf_counter()
+resp = app.test_client().get("/readyz")
+t_first = time.perf_counter()
+while app.extensions["startup_status"].get("catch_up") in ("pending", "running"):
+    time.sleep(0.05)
+t_catch_up = time.perf_counter()
+print(json.dumps({
+    "import_s": t_import - t0,
+    "create_app_s": t_create - t_import,
+    "first_request_s": t_first - t0,
+    "first_status": resp.status_code,
+    "catch_up_done_s": t_catch_up - t0,
+    "heavy_modules_loaded_before_request": sorted(
+        m for m in ("smtplib", "email.mime.multipart", "dateutil.relativedelta") if m in __import__("sys").modules
+    ),
+}))
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--schedules", type=int, default=5000)
+    args = ap.parse_args()
+
+    from benchmarks.bench_planning import seed
+
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench-startup-")
+    os.close(fd)
+    uri = f"sqlite:///{path}"
+    app = make_app(uri)
+    with app.app_context():
+        seed(args.schedules, datetime.now(pytz.timezone(Config.APP_TZ)).date())
+
+    env = dict(os.environ, DATABASE_URL=uri, EMAIL_DRY_RUN="true", OUTBOX_EMBEDDED_WORKER="false")
+    out = subprocess.run([sys.executable, "-c", _PROBE], env=env, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    for key, value in result.items():
+        print(f"{key:38s} {value:.3f}" if isinstance(value, float) else f"{key:38s} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Assert that loading the dashboard writes nothing and that advancing next
+due dates leaves `schedules.updated_at` alone.
+
+Generates schedules, stamps them with a known updated_at and a stale (empty)
+next_due_date, and loads a few dashboard pages: they must not write to
+`schedules` (its cache version stays put, so the pages keep hitting the
+cache). Then the due dates are advanced the way the daily job does. next_due_date is derived data: moving it on is not
+an edit, so updated_at ("last edited", the render cache key, the API's
+updated_at and ETags) must come out unchanged.
+
+    python -m benchmarks.check_dashboard
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import update
+
+from config import Config
+from models import db, Schedule
+
+STAMP = datetime(2020, 1, 1, 12, 0)
+
+
+def _make_stale():
+    table = Schedule.__table__
+    db.session.execute(update(table).values(next_due_date=None, updated_at=STAMP))
+    db.session.commit()
+
+
+def _changed_stamps() -> int:
+    return db.session.query(Schedule).filter(Schedule.updated_at != STAMP).count()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Check that dashboard loads do not touch schedules.updated_at.")
+    ap.add_argument("--schedules", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench-dashboard-")
+    os.close(fd)
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+    Config.METRICS_ENABLED = False
+    import cache
+    from app import create_app
+    from benchmarks.generator import populate
+    from planner import advance_next_dues, local_today
+
+    try:
+        app = create_app()
+        with app.app_context():
+            populate(args.schedules, 0, local_today(), args.seed)
+            _make_stale()
+            client = app.test_client()
+            version = cache.get_store().versions(("schedules",))
+            for url in ("/", "/?sort=entity", "/"):
+                assert client.get(url).status_code == 200
+            dashboard_wrote = cache.get_store().versions(("schedules",)) != version
+            after_dashboard = _changed_stamps()
+            _make_stale()
+            advanced = advance_next_dues()
+            after_advance = _changed_stamps()
+            db.engine.dispose()
+    finally:
+        os.remove(path)
+
+    print(f"{args.schedules} schedules: dashboard {'wrote to' if dashboard_wrote else 'did not write'} schedules, "
+          f"{advanced} next due date(s) advanced, updated_at changed on {after_dashboard} after the dashboard "
+          f"and {after_advance} after advancing")
+    if dashboard_wrote or after_dashboard or after_advance or not advanced:
+        print("FAIL")
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
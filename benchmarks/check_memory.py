@@ -0,0 +1,89 @@
+"""Assert that a reminder run's peak memory does not grow with the schedule count.
+
+Generates two databases, one with N schedules and one with 10 x N, and runs
+the startup catch-up (planning, the missed-reminder window and today's
+reminders) against each in a fresh subprocess, reading that process's peak
+RSS. The scan streams its rows in bounded chunks, so the larger run's peak
+may only exceed the smaller one's by a fraction (mostly SQLite's page cache
+filling up); the bound is relative because the baseline (interpreter,
+imports, allocator arenas) varies with the platform. Exits non-zero when it
+does not.
+
+The check runs with DIGEST_MODE off: digest mode groups a zone's reminders
+by recipients across the whole window, so it holds that zone's candidates at
+once and is not covered by the bound.
+
+    python -m benchmarks.check_memory
+    python -m benchmarks.check_memory --schedules 5000 --max-ratio 1.1
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import make_app
+from benchmarks.generator import populate
+from config import Config
+from models import db
+
+
+def _child(path: str):
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+    Config.EMAIL_DRY_RUN = True
+    Config.METRICS_ENABLED = False
+    Config.DIGEST_MODE = False
+    from app import create_app
+    import scheduler
+
+    with create_app().app_context():
+        scheduler.catch_up()
+        queued = db.session.execute(db.text("SELECT COUNT(*) FROM outbox_messages")).scalar()
+    # ru_maxrss is KiB on Linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, queued)
+
+
+def _measure(n_schedules: int, seed: int):
+    from planner import local_today
+
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench-memory-")
+    os.close(fd)
+    try:
+        with make_app(f"sqlite:///{path}").app_context():
+            populate(n_schedules, 0, local_today(), seed)
+            db.engine.dispose()
+        out = subprocess.run([sys.executable, "-m", "benchmarks.check_memory", "--child", path],
+                             capture_output=True, text=True, check=True).stdout.split()
+        return int(out[-2]), int(out[-1])
+    finally:
+        os.remove(path)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Check that peak RSS of a run stays flat as schedules grow 10x.")
+    ap.add_argument("--schedules", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-ratio", type=float, default=1.2,
+                    help="allowed peak RSS of the 10x run as a multiple of the 1x run")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        _child(args.child)
+        return 0
+
+    small, small_queued = _measure(args.schedules, args.seed)
+    large, large_queued = _measure(args.schedules * 10, args.seed)
+    growth = (large - small) / 1024
+    print(f"{args.schedules:>7d} schedules: {small / 1024:7.1f} MiB peak RSS, {small_queued} messages queued")
+    print(f"{args.schedules * 10:>7d} schedules: {large / 1024:7.1f} MiB peak RSS, {large_queued} messages queued")
+    print(f"growth {growth:+.1f} MiB, {large / small:.2f}x (limit {args.max_ratio:.2f}x)")
+    if large > small * args.max_ratio:
+        print("FAIL: peak memory grows with the number of schedules")
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
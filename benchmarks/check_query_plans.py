@@ -0,0 +1,73 @@
+"""Assert that the hot reminder_logs queries are served by an index.
+
+Seeds a scratch SQLite database, runs ANALYZE, and checks EXPLAIN QUERY PLAN
+for the dedup lookup, the retry scan, the newest-first log listing and the
+keyset pages behind /logs and the dashboard.
+Exits non-zero if any of them falls back to a full table scan.
+
+    python -m benchmarks.check_query_plans
+"""
+import sys
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import make_app
+from config import Config
+from models import db, Schedule, ReminderLog
+from sqlalchemy import tuple_
+
+
+def _plan(query) -> str:
+    sql = str(query.statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+    rows = db.session.execute(db.text("EXPLAIN QUERY PLAN " + sql)).all()
+    return "\n".join(r[-1] for r in rows)
+
+
+def main() -> int:
+    app = make_app()
+    with app.app_context():
+        db.session.add(Schedule(id=1, entity_name="E", report_name="R",
+                                anchor_due_date=date(2024, 1, 31), interval_months=1,
+                                recipient_emails="a@example.com"))
+        start = date(2020, 1, 1)
+        db.session.execute(db.insert(ReminderLog), [
+            dict(schedule_id=1, planned_due_date=start + timedelta(days=i),
+                 reminder_offset_days=i % 4, status="FAILED" if i % 10 == 0 else "SENT",
+                 sent_at=datetime(2020, 1, 1) + timedelta(hours=i), backfilled=False, retry_count=0,
+                 next_attempt_at=datetime(2020, 1, 1) + timedelta(hours=i, minutes=15) if i % 10 == 0 else None)
+            for i in range(5000)
+        ])
+        db.session.commit()
+        db.session.execute(db.text("ANALYZE"))
+
+        checks = {
+            "dedup lookup": ReminderLog.query.filter_by(
+                schedule_id=1, planned_due_date=date(2021, 1, 1),
+                reminder_offset_days=3, status="SENT"),
+            "retry scan": ReminderLog.query.filter(
+                ReminderLog.status == "FAILED",
+                ReminderLog.next_attempt_at <= datetime(2020, 6, 1))
+                .order_by(ReminderLog.next_attempt_at).limit(Config.LOG_WRITE_CHUNK_SIZE),
+            "latest logs": ReminderLog.query.order_by(ReminderLog.sent_at.desc()).limit(50),
+            "logs page (keyset)": ReminderLog.query.filter(
+                tuple_(ReminderLog.sent_at, ReminderLog.id) < tuple_("2020-06-01 00:00:00", 3000))
+                .order_by(ReminderLog.sent_at.desc(), ReminderLog.id.desc()).limit(51),
+            "logs page for one schedule": ReminderLog.query.filter(
+                ReminderLog.schedule_id == 1,
+                tuple_(ReminderLog.sent_at, ReminderLog.id) < tuple_("2020-06-01 00:00:00", 3000))
+                .order_by(ReminderLog.sent_at.desc(), ReminderLog.id.desc()).limit(51),
+            "dashboard page": Schedule.query.filter(
+                Schedule.active.is_(True), Schedule.next_due_date.isnot(None),
+                tuple_(Schedule.next_due_date, Schedule.id) > tuple_("2024-01-31", 1))
+                .order_by(Schedule.next_due_date, Schedule.id).limit(51),
+        }
+        failed = False
+        for name, query in checks.items():
+            plan = _plan(query)
+            uses_index = "USING INDEX" in plan or "USING COVERING INDEX" in plan
+            failed |= not uses_index
+            print(f"[{'ok' if uses_index else 'FULL SCAN'}] {name}\n    " + plan.replace("\n", "\n    "))
+        return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
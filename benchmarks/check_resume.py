@@ -0,0 +1,113 @@
+"""Assert that a reminder run that fails midway is resumed from its checkpoint.
+
+For each case a fresh database gets schedules due today in some zones (the
+others stay empty). The engine is made to fail on a claim past the first
+checkpoint; the next run of the same job must be recorded as resumed from
+the failed one, finish DONE, and leave exactly the reminder logs and outbox
+messages an uninterrupted run produces. The digest case checks that zones
+with nothing pending do not break the checkpointing.
+
+    python -m benchmarks.check_resume
+"""
+import os
+import sys
+import tempfile
+
+from config import Config
+from models import db, JobRun, OutboxMessage, ReminderLog, Schedule
+
+JOB = "check_resume"
+
+# (name, digest mode, chunk size, schedules per zone, claim call that fails)
+CASES = (
+    ("chunked", False, 5, (20, 0, 8), 3),
+    ("digest", True, 200, (5, 0, 5), 2),
+)
+
+
+def _populate(per_zone):
+    from planner import local_today, schedule_timezones
+    from recipients import sync_schedule
+
+    for tz, count in zip(schedule_timezones(), per_zone):
+        for i in range(count):
+            s = Schedule(
+                entity_name=f"Entity {tz} {i}",
+                report_name="Laporan Bulanan",
+                anchor_due_date=local_today(tz),
+                interval_months=1,
+                recipient_emails=f"pic{i % 2}@entity.example",
+                reminder_offsets_days="0",
+                timezone=tz,
+            )
+            db.session.add(s)
+            sync_schedule(s)
+    db.session.commit()
+
+
+def _counts():
+    return (db.session.query(ReminderLog).count(), db.session.query(OutboxMessage).count())
+
+
+def _run_case(digest: bool, chunk_size: int, per_zone, fail_on: int | None):
+    """Run the engine on a fresh database, failing on claim call `fail_on`
+    first if given. Returns (counts, runs)."""
+    import scheduler
+    from app import create_app
+
+    Config.DIGEST_MODE = digest
+    Config.LOG_WRITE_CHUNK_SIZE = chunk_size
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench-resume-")
+    os.close(fd)
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+    claim = scheduler._claim_and_queue
+    try:
+        with create_app().app_context():
+            _populate(per_zone)
+            if fail_on:
+                calls = []
+
+                def failing_claim(*args):
+                    calls.append(1)
+                    if len(calls) == fail_on:
+                        raise RuntimeError("simulated crash")
+                    return claim(*args)
+
+                scheduler._claim_and_queue = failing_claim
+                try:
+                    scheduler.run_reminders(job=JOB)
+                except RuntimeError:
+                    pass
+                finally:
+                    scheduler._claim_and_queue = claim
+            scheduler.run_reminders(job=JOB)
+            runs = [(r.id, r.status, r.resumed_from, r.cursor_zone) for r in JobRun.query.order_by(JobRun.id)]
+            counts = _counts()
+            db.engine.dispose()
+        return counts, runs
+    finally:
+        scheduler._claim_and_queue = claim
+        os.remove(path)
+
+
+def main() -> int:
+    Config.EMAIL_DRY_RUN = True
+    Config.METRICS_ENABLED = False
+    Config.CACHE_TTL_SECONDS = 0
+    failed = False
+    for name, digest, chunk_size, per_zone, fail_on in CASES:
+        expected, _ = _run_case(digest, chunk_size, per_zone, None)
+        counts, runs = _run_case(digest, chunk_size, per_zone, fail_on)
+        ok = (
+            len(runs) == 2
+            and runs[0][1] == "FAILED" and runs[0][3] is not None
+            and runs[1][1] == "DONE" and runs[1][2] == runs[0][0]
+            and counts == expected
+        )
+        print(f"{name:8s} logs/messages {counts} (uninterrupted {expected}), runs {runs}: {'ok' if ok else 'FAIL'}")
+        failed |= not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from flask import Flask
+from sqlalchemy import event
+
+from config import Config
+from models import db
+
+
+def make_app(db_uri: str | None = None) -> Flask:
+    """A bare app bound to a scratch database, without the scheduler or routes."""
+    if db_uri is None:
+        fd, path = tempfile.mkstemp(suffix=".db", prefix="bench-")
+        os.close(fd)
+        db_uri = f"sqlite:///{path}"
+    app = Flask("benchmarks")
+    app.config.from_object(Config)
+    app.config["SQLALCHEMY_DATABASE_URI"] = db_uri
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+class QueryCounter:
+    """Counts statements executed on the engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+@contextmanager
+def timed(results: dict, key: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[key] = time.perf_counter() - start
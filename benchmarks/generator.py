@@ -0,0 +1,112 @@
+"""Synthetic schedules and reminder history at production-like scale.
+
+Schedules get a deterministic mix of intervals (one-off, monthly, quarterly,
+half-yearly, yearly), offset sets, recipient groups and anchors around
+`today`; logs are past SENT reminders with a share of FAILED (due for retry)
+and DEAD rows. The same seed always yields the same data.
+
+    python -m benchmarks.generator --schedules 5000 --logs 200000 --db /tmp/bench.db
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from config import Config
+from models import db, Schedule, ReminderLog
+from recipients import backfill
+from utils import next_occurrence
+
+INTERVALS = (0, 1, 1, 1, 3, 3, 6, 12)
+OFFSET_SETS = (None, "7,3,1,0", "14,7,3,0", "30,14,7,1,0", "3,0")
+TIMEZONES = (None, None, "Asia/Jakarta", "Asia/Makassar", "Asia/Jayapura")
+
+
+def schedule_rows(n: int, today: date, seed: int = 0):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for i in range(n):
+        interval = rng.choice(INTERVALS)
+        # One-offs land ahead of today, recurring anchors up to two years back.
+        anchor = today + timedelta(days=rng.randint(-730 if interval else 0, 120))
+        group = rng.randrange(max(1, n // 20))  # ~20 schedules share a PIC group
+        yield dict(
+            entity_name=f"Entity {i % max(1, n // 4):05d}",
+            report_name=f"Report {rng.randrange(60):02d}",
+            description="Disampaikan melalui portal pelaporan." if i % 3 == 0 else None,
+            anchor_due_date=anchor,
+            interval_months=interval,
+            next_due_date=next_occurrence(anchor, interval, today),
+            recipient_emails=f"pic{group}@entity.example, compliance{group}@entity.example",
+            cc_emails="pengawas@example.go.id" if i % 4 == 0 else None,
+            reminder_offsets_days=rng.choice(OFFSET_SETS),
+            active=rng.random() > 0.05,
+            timezone=rng.choice(TIMEZONES),
+            created_at=now,
+            updated_at=now,
+        )
+
+
+def log_rows(m: int, n_schedules: int, today: date, seed: int = 0,
+             failed_ratio: float = 0.02, dead_ratio: float = 0.01):
+    """Past reminders; keys are unique per (schedule, due, offset)."""
+    rng = random.Random(seed + 1)
+    start = datetime.combine(today, datetime.min.time())
+    for i in range(m):
+        schedule_id = 1 + i % n_schedules
+        age = i // n_schedules + 1
+        due = today - timedelta(days=30 * age)
+        roll = rng.random()
+        status = "FAILED" if roll < failed_ratio else "DEAD" if roll < failed_ratio + dead_ratio else "SENT"
+        sent_at = start - timedelta(days=30 * age, minutes=rng.randrange(600))
+        yield dict(
+            schedule_id=schedule_id,
+            planned_due_date=due,
+            reminder_offset_days=rng.choice((7, 3, 1, 0)),
+            status=status,
+            sent_at=sent_at,
+            backfilled=False,
+            retry_count=Config.MAX_RETRY_ATTEMPTS if status == "DEAD" else 0,
+            error_message="Connection refused" if status != "SENT" else None,
+            next_attempt_at=start - timedelta(minutes=1) if status == "FAILED" else None,
+        )
+
+
+def _insert(model, rows, chunk: int = 5000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            db.session.execute(db.insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+    db.session.commit()
+
+
+def populate(n_schedules: int, m_logs: int, today: date, seed: int = 0):
+    """Insert the generated data into the current app's (empty) database."""
+    _insert(Schedule, schedule_rows(n_schedules, today, seed))
+    backfill(db.session)
+    db.session.commit()
+    _insert(ReminderLog, log_rows(m_logs, n_schedules, today, seed))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fill a database with synthetic schedules and logs.")
+    ap.add_argument("--schedules", type=int, default=1000)
+    ap.add_argument("--logs", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--db", required=True, help="SQLite file to (re)create")
+    args = ap.parse_args()
+
+    from benchmarks.common import make_app
+    from planner import local_today
+
+    app = make_app(f"sqlite:///{args.db}")
+    with app.app_context():
+        populate(args.schedules, args.logs, local_today(), args.seed)
+    print(f"{args.db}: {args.schedules} schedules, {args.logs} logs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Scenario runner: the app's hot paths against generated data and a stub relay.
+
+Generates N schedules and M logs once into a template database, then runs
+each scenario on a fresh copy of it with mail going to a local stub SMTP sink
+(configurable latency and failure rate). Each scenario is run twice: once
+for wall clock and statement count, once under tracemalloc for the memory
+peak, so tracing overhead does not skew the timings. Results go to JSON so
+runs can be compared across commits.
+
+    python -m benchmarks.run --schedules 2000 --logs 50000
+    python -m benchmarks.run --scenarios daily_scan,route_logs --latency-ms 20 --failure-rate 0.05
+    python -m benchmarks.run --compare benchmarks/results/abc1234.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import mailer
+from benchmarks.bench_smtp_pool import _PlainPool
+from benchmarks.common import QueryCounter, make_app
+from benchmarks.generator import populate
+from benchmarks.smtp_stub import StubSMTPServer
+from config import Config
+from models import db, Schedule
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _drain():
+    from outbox import drain
+
+    return drain()
+
+
+def daily_scan(app):
+    import scheduler
+
+    scheduler.scan_and_send_reminders()
+    return {"messages_sent": _drain()}
+
+
+def missed_backfill(app):
+    import scheduler
+
+    scheduler.scan_missed_reminders()
+    return {"messages_sent": _drain()}
+
+
+def retry_pass(app):
+    import scheduler
+
+    scheduler.retry_failed_reminders()
+    return {"messages_sent": _drain()}
+
+
+def route_index(app, requests: int = 20):
+    client = app.test_client()
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        assert client.get("/").status_code == 200
+        timings.append(time.perf_counter() - start)
+    return {"first_ms": timings[0] * 1000, "mean_ms": sum(timings) / len(timings) * 1000}
+
+
+def route_logs(app, pages: int = 10):
+    client = app.test_client()
+    url, timings = "/logs", []
+    for _ in range(pages):
+        start = time.perf_counter()
+        html = client.get(url).get_data(as_text=True)
+        timings.append(time.perf_counter() - start)
+        older = re.search(r'href="([^"]*after=[^"]*)"', html)
+        if not older:
+            break
+        url = older.group(1).replace("&amp;", "&")
+    start = time.perf_counter()
+    client.get("/logs?status=FAILED")
+    filtered = time.perf_counter() - start
+    return {"pages": len(timings), "mean_page_ms": sum(timings) / len(timings) * 1000,
+            "filtered_ms": filtered * 1000}
+
+
+def render_templates(app, count: int = 1000):
+    import email_templates
+    from planner import local_today
+
+    email_templates._cache.clear()
+    today = local_today()
+    schedules = Schedule.query.order_by(Schedule.id).limit(count).all()
+    timings = {}
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        for sch in schedules:
+            subject, html, text = email_templates.render_reminder(sch, sch.next_due_date or today, 3)
+            mailer.build_message([], ["cc@example.com"], subject, html, text)
+        timings[f"{label}_us_per_message"] = (time.perf_counter() - start) / max(1, len(schedules)) * 1e6
+    return timings
+
+
+def forecast_year(app):
+    from datetime import timedelta
+    from forecast import forecast
+    from planner import local_today
+
+    today = local_today()
+    result = forecast(today, today + timedelta(days=364))
+    peak = result.peak_day()
+    return {"reminders": result.totals().reminders, "peak_day_messages": peak[1].messages if peak else 0}
+
+
+SCENARIOS = {
+    "daily_scan": daily_scan,
+    "missed_backfill": missed_backfill,
+    "retry_pass": retry_pass,
+    "route_index": route_index,
+    "route_logs": route_logs,
+    "render_templates": render_templates,
+    "forecast_year": forecast_year,
+}
+
+
+def _app_on_copy(template: str):
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench-run-")
+    os.close(fd)
+    shutil.copyfile(template, path)
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+    from app import create_app
+
+    return create_app(), path
+
+
+def _run_once(name: str, template: str, smtp_port: int, trace_memory: bool):
+    app, path = _app_on_copy(template)
+    mailer._pool = _PlainPool("127.0.0.1", smtp_port, max_size=max(Config.SMTP_POOL_SIZE, Config.SEND_WORKERS))
+    try:
+        with app.app_context(), QueryCounter(db.engine) as queries:
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            extra = SCENARIOS[name](app)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+            db.engine.dispose()
+        return elapsed, queries.count, peak, extra
+    finally:
+        mailer.close_smtp_pool()
+        os.remove(path)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(base_path: str, results: dict):
+    with open(base_path) as f:
+        base = json.load(f)["results"]
+    print(f"\n{'scenario':18s} {'base s':>9s} {'now s':>9s} {'ratio':>7s} {'queries':>15s}")
+    for name, now in results.items():
+        old = base.get(name)
+        if not old:
+            continue
+        ratio = now["seconds"] / old["seconds"] if old["seconds"] else float("nan")
+        print(f"{name:18s} {old['seconds']:9.3f} {now['seconds']:9.3f} {ratio:7.2f} "
+              f"{old['queries']:>7d} -> {now['queries']:<5d}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run benchmark scenarios and write results as JSON.")
+    ap.add_argument("--schedules", type=int, default=2000)
+    ap.add_argument("--logs", type=int, default=50000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--scenarios", default="all", help="comma-separated names or 'all'")
+    ap.add_argument("--latency-ms", type=float, default=5.0, help="stub SMTP reply latency")
+    ap.add_argument("--handshake-ms", type=float, default=50.0, help="stub SMTP connect latency")
+    ap.add_argument("--failure-rate", type=float, default=0.0, help="share of DATA commands rejected")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    ap.add_argument("--output", help="JSON path (default: benchmarks/results/<commit>.json)")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    args = ap.parse_args()
+
+    names = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    Config.EMAIL_DRY_RUN = False
+    Config.SMTP_HOST = "127.0.0.1"
+    Config.METRICS_ENABLED = False
+
+    from planner import local_today
+
+    fd, template = tempfile.mkstemp(suffix=".db", prefix="bench-template-")
+    os.close(fd)
+    start = time.perf_counter()
+    with make_app(f"sqlite:///{template}").app_context():
+        populate(args.schedules, args.logs, local_today(), args.seed)
+        db.engine.dispose()
+    print(f"generated {args.schedules} schedules / {args.logs} logs in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    try:
+        with StubSMTPServer(handshake_latency=args.handshake_ms / 1000, command_latency=args.latency_ms / 1000,
+                            failure_rate=args.failure_rate, seed=args.seed) as smtp:
+            Config.SMTP_PORT = smtp.port
+            for name in names:
+                elapsed, queries, _, extra = _run_once(name, template, smtp.port, trace_memory=False)
+                peak = None
+                if not args.no_memory:
+                    peak = _run_once(name, template, smtp.port, trace_memory=True)[2]
+                results[name] = dict(seconds=elapsed, queries=queries,
+                                     peak_memory_kib=peak // 1024 if peak is not None else None, **extra)
+                print(f"{name:18s} {elapsed:8.3f}s {queries:7d} queries "
+                      f"{'-' if peak is None else f'{peak / 1048576:7.1f} MiB peak'}  "
+                      + " ".join(f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in extra.items()))
+    finally:
+        os.remove(template)
+
+    commit = _commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": dict(
+                commit=commit,
+                created_at=datetime.utcnow().isoformat() + "Z",
+                python=platform.python_version(),
+                schedules=args.schedules, logs=args.logs, seed=args.seed,
+                smtp_latency_ms=args.latency_ms, smtp_handshake_ms=args.handshake_ms,
+                smtp_failure_rate=args.failure_rate,
+            ),
+            "results": results,
+        }, f, indent=2)
+    print(f"results written to {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
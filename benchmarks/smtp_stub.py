@@ -0,0 +1,83 @@
+"""Minimal in-process SMTP sink for benchmarks.
+
+Speaks just enough SMTP (EHLO/HELO, MAIL, RCPT, DATA, NOOP, RSET, QUIT) for
+smtplib. `handshake_latency` is slept on every new connection to stand in for
+TCP + STARTTLS + AUTH cost on a real relay; `command_latency` is slept before
+each reply.
+"""
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        if self.server.command_latency:
+            time.sleep(self.server.command_latency)
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        srv = self.server
+        with srv.lock:
+            srv.connections += 1
+        if srv.handshake_latency:
+            time.sleep(srv.handshake_latency)
+        self.wfile.write(b"220 stub ESMTP\r\n")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            cmd = raw.decode(errors="replace").strip().upper()
+            if cmd.startswith("EHLO"):
+                self.wfile.write(b"250-stub\r\n250 8BITMIME\r\n")
+            elif cmd.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif cmd == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                if srv.failure_rate and srv.rng() < srv.failure_rate:
+                    self._reply("451 Temporary failure")
+                    continue
+                with srv.lock:
+                    srv.messages += 1
+                self._reply("250 Queued")
+            elif cmd == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Not implemented")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, handshake_latency=0.0,
+                 command_latency=0.0, failure_rate=0.0, seed=0):
+        import random
+
+        super().__init__((host, port), _Handler)
+        self.handshake_latency = handshake_latency
+        self.command_latency = command_latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed).random
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = 0
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,473 @@
+"""Streaming bulk import/export of schedules and reminder history.
+
+Imports read CSV or JSONL row by row, validate each row and insert valid
+ones with an executemany INSERT per chunk, one transaction per chunk, so a
+bad row is reported with its line number instead of failing the file.
+Exports are generators over a server-side cursor and never hold more than
+one chunk in memory. `upsert_schedules` is the all-or-nothing counterpart
+behind the JSON API: schedules are matched on (entity_name, report_name)
+and the whole batch is written in one transaction.
+
+    python -m bulk import schedules.csv
+    python -m bulk export schedules -o schedules.jsonl
+    python -m bulk export logs --status FAILED -o failed.csv
+"""
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import NamedTuple
+from sqlalchemy import insert, tuple_, update
+from config import Config
+from models import db, Schedule, ReminderLog
+from planner import local_today, plan_schedules, replan_schedules, schedule_timezones
+from recipients import add_recipients, resync_recipients
+from utils import EMAIL_RE, next_occurrence, parse_csv_emails, parse_offsets
+
+SCHEDULE_FIELDS = (
+    "entity_name",
+    "report_name",
+    "description",
+    "anchor_due_date",
+    "interval_months",
+    "recipient_emails",
+    "cc_emails",
+    "reminder_offsets_days",
+    "timezone",
+    "active",
+)
+LOG_FIELDS = (
+    "id",
+    "schedule_id",
+    "entity_name",
+    "report_name",
+    "planned_due_date",
+    "reminder_offset_days",
+    "status",
+    "sent_at",
+    "backfilled",
+    "retry_count",
+    "error_message",
+)
+
+# Only errors up to this many are kept for the report; all are counted.
+MAX_REPORTED_ERRORS = 1000
+EXPORT_CHUNK_SIZE = 1000
+
+
+class ImportResult(NamedTuple):
+    inserted: int
+    error_count: int
+    errors: list  # [(line number, message)]
+
+
+class UpsertResult(NamedTuple):
+    inserted: int
+    updated: int
+    unchanged: int
+    deactivated: int
+    not_found: list  # [(entity_name, report_name)] asked to deactivate but unknown
+    errors: list     # [(section, index, message)]; nothing was written if any
+
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+def iter_rows(stream, fmt: str):
+    """Yield (line number, dict) from a text stream; unparsable JSON lines
+    yield their error message instead of a dict."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"invalid JSON: {e}"
+            continue
+        yield line_no, row if isinstance(row, dict) else "expected a JSON object"
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return str(value).strip()
+
+
+def _emails(value, field: str, required: bool):
+    emails = parse_csv_emails(_text(value))
+    if required and not emails:
+        raise ValueError(f"{field} is required")
+    bad = [e for e in emails if not EMAIL_RE.match(e)]
+    if bad:
+        raise ValueError(f"{field}: invalid address {bad[0]!r}")
+    return ", ".join(emails) or None
+
+
+def _offsets(value):
+    text = _text(value)
+    if not text:
+        return None
+    for token in text.split(","):
+        if token.strip() and not re.fullmatch(r"-?\d+", token.strip()):
+            raise ValueError(f"reminder_offsets_days: expected comma-separated integers, got {text!r}")
+    return ",".join(str(o) for o in parse_offsets(text))
+
+
+def _timezone(value):
+    text = _text(value)
+    if not text:
+        return None
+    if text not in schedule_timezones():
+        raise ValueError(f"timezone: expected one of {', '.join(schedule_timezones())}, got {text!r}")
+    return text
+
+
+def _bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = _text(value).lower()
+    if text in ("", "1", "true", "yes", "y", "ya"):
+        return True
+    if text in ("0", "false", "no", "n", "tidak"):
+        return False
+    raise ValueError(f"active: expected true/false, got {text!r}")
+
+
+def parse_schedule_row(row: dict, today: date) -> dict:
+    """Validate one import row into Schedule column values; raises ValueError."""
+    values = {}
+    for field in ("entity_name", "report_name"):
+        values[field] = _text(row.get(field))
+        if not values[field]:
+            raise ValueError(f"{field} is required")
+        if len(values[field]) > 200:
+            raise ValueError(f"{field} is longer than 200 characters")
+    values["description"] = _text(row.get("description")) or None
+    try:
+        values["anchor_due_date"] = datetime.strptime(_text(row.get("anchor_due_date")), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"anchor_due_date: expected YYYY-MM-DD, got {_text(row.get('anchor_due_date'))!r}")
+    try:
+        values["interval_months"] = int(_text(row.get("interval_months")) or 0)
+    except ValueError:
+        raise ValueError("interval_months: expected an integer")
+    if values["interval_months"] < 0:
+        raise ValueError("interval_months must not be negative")
+    values["recipient_emails"] = _emails(row.get("recipient_emails"), "recipient_emails", required=True)
+    values["cc_emails"] = _emails(row.get("cc_emails"), "cc_emails", required=False)
+    values["reminder_offsets_days"] = _offsets(row.get("reminder_offsets_days"))
+    values["offsets"] = parse_offsets(values["reminder_offsets_days"]) or None
+    values["timezone"] = _timezone(row.get("timezone"))
+    values["active"] = _bool(row.get("active"))
+    values["next_due_date"] = next_occurrence(values["anchor_due_date"], values["interval_months"],
+                                              local_today(values["timezone"]) if values["timezone"] else today)
+    return values
+
+
+def _insert_rows(rows):
+    """Insert, then add recipients and plan, schedule column values. Does
+    not commit."""
+    inserted = db.session.execute(
+        insert(Schedule).returning(
+            Schedule.id,
+            Schedule.anchor_due_date,
+            Schedule.interval_months,
+            Schedule.offsets,
+            Schedule.recipient_emails,
+            Schedule.cc_emails,
+            Schedule.active,
+        ),
+        rows,
+    ).all()
+    add_recipients(inserted)
+    plan_schedules([sch for sch in inserted if sch.active])
+    return len(inserted)
+
+
+def _insert_chunk(rows):
+    inserted = _insert_rows(rows)
+    db.session.commit()
+    return inserted
+
+
+def import_schedules(stream, fmt: str = "csv", chunk_size: int | None = None) -> ImportResult:
+    """Import schedules from a CSV/JSONL text stream. Valid rows are inserted
+    (and planned) chunk by chunk; invalid rows are skipped and reported."""
+    chunk_size = chunk_size or Config.LOG_WRITE_CHUNK_SIZE
+    today = local_today()
+    inserted = 0
+    error_count = 0
+    errors = []
+    chunk = []
+    for line_no, row in iter_rows(stream, fmt):
+        try:
+            if isinstance(row, str):
+                raise ValueError(row)
+            chunk.append(parse_schedule_row(row, today))
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append((line_no, str(e)))
+            continue
+        if len(chunk) >= chunk_size:
+            inserted += _insert_chunk(chunk)
+            chunk = []
+    if chunk:
+        inserted += _insert_chunk(chunk)
+    return ImportResult(inserted, error_count, errors)
+
+
+def _key(row) -> tuple:
+    return _text(row.get("entity_name")), _text(row.get("report_name"))
+
+
+def _existing(keys):
+    """{(entity_name, report_name): [schedule rows]} for `keys`, one indexed
+    query per LOG_WRITE_CHUNK_SIZE keys."""
+    keys = list(keys)
+    found = {}
+    columns = (Schedule.id, Schedule.next_due_date, *(getattr(Schedule, f) for f in SCHEDULE_FIELDS))
+    for i in range(0, len(keys), Config.LOG_WRITE_CHUNK_SIZE):
+        rows = db.session.execute(
+            db.select(*columns)
+            .where(tuple_(Schedule.entity_name, Schedule.report_name).in_(keys[i:i + Config.LOG_WRITE_CHUNK_SIZE]))
+            .order_by(Schedule.id)
+        )
+        for row in rows:
+            found.setdefault((row.entity_name, row.report_name), []).append(row)
+    return found
+
+
+def _executemany(stmt, rows):
+    for i in range(0, len(rows), Config.LOG_WRITE_CHUNK_SIZE):
+        db.session.execute(stmt, rows[i:i + Config.LOG_WRITE_CHUNK_SIZE])
+
+
+def _update_rows(rows):
+    """executemany UPDATE by primary key of full schedule column values
+    (with id), then rebuild their recipients and plan. Does not commit."""
+    _executemany(update(Schedule), rows)
+    written = [SimpleNamespace(**row) for row in rows]
+    resync_recipients(written)
+    replan_schedules(written)
+
+
+def upsert_schedules(rows, deactivate=(), today: date | None = None) -> UpsertResult:
+    """Insert or update schedules matched on (entity_name, report_name) and
+    deactivate the `deactivate` keys, in one transaction. Every row is
+    validated first; if any is invalid, ambiguous or repeated nothing is
+    written and the errors are returned. Rows equal to what is stored are
+    counted as unchanged and not written."""
+    today = today or local_today()
+    errors = []
+    parsed = {}
+    for index, row in enumerate(rows):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+            values = parse_schedule_row(row, today)
+        except ValueError as e:
+            errors.append(("upsert", index, str(e)))
+            continue
+        key = (values["entity_name"], values["report_name"])
+        if key in parsed:
+            errors.append(("upsert", index, f"duplicate of row {parsed[key][0]}"))
+            continue
+        parsed[key] = (index, values)
+    off = {}
+    for index, row in enumerate(deactivate):
+        key = _key(row) if isinstance(row, dict) else ("", "")
+        if not all(key):
+            errors.append(("deactivate", index, "entity_name and report_name are required"))
+        elif key in parsed:
+            errors.append(("deactivate", index, f"also upserted by row {parsed[key][0]}"))
+        else:
+            off.setdefault(key, index)
+
+    existing = _existing([*parsed, *off]) if parsed or off else {}
+    for key, matches in existing.items():
+        if len(matches) > 1:
+            section, index = ("upsert", parsed[key][0]) if key in parsed else ("deactivate", off[key])
+            errors.append((section, index, f"matches {len(matches)} schedules (ids {', '.join(str(m.id) for m in matches)})"))
+    if errors:
+        return UpsertResult(0, 0, 0, 0, [], sorted(errors))
+
+    now = datetime.utcnow()
+    inserts, updates, unchanged = [], [], 0
+    for key, (_, values) in parsed.items():
+        current = existing.get(key)
+        if current is None:
+            inserts.append(values)
+        elif all(getattr(current[0], f) == values[f] for f in SCHEDULE_FIELDS) \
+                and current[0].next_due_date == values["next_due_date"]:
+            unchanged += 1
+        else:
+            updates.append(dict(values, id=current[0].id, updated_at=now))
+    deactivated = [
+        dict(id=sch.id, active=False, updated_at=now)
+        for key in off for sch in existing.get(key, ()) if sch.active
+    ]
+    not_found = [key for key in off if key not in existing]
+
+    inserted = sum(_insert_rows(inserts[i:i + Config.LOG_WRITE_CHUNK_SIZE])
+                   for i in range(0, len(inserts), Config.LOG_WRITE_CHUNK_SIZE))
+    _update_rows(updates)
+    _executemany(update(Schedule), deactivated)
+    replan_schedules([SimpleNamespace(**row) for row in deactivated])
+    db.session.commit()
+    return UpsertResult(inserted, len(updates), unchanged, len(deactivated), not_found, [])
+
+
+def jsonable(value):
+    """A column value as JSON can hold it (dates as ISO strings); also the
+    json.dumps `default` for API responses."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _stream(query, fields, fmt: str):
+    """Yield the rows of a column query as CSV or JSONL text, a chunk of rows
+    per yielded string."""
+    rows = query.execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(fields)
+    for n, row in enumerate(rows, start=1):
+        if writer:
+            writer.writerow([jsonable(v) if v is not None else "" for v in row])
+        else:
+            buf.write(json.dumps(dict(zip(fields, map(jsonable, row))), ensure_ascii=False) + "\n")
+        if n % EXPORT_CHUNK_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def export_schedules(fmt: str = "csv"):
+    query = db.session.query(*(getattr(Schedule, f) for f in ("id",) + SCHEDULE_FIELDS)).order_by(Schedule.id)
+    return _stream(query, ("id",) + SCHEDULE_FIELDS, fmt)
+
+
+def log_export_query(query=None):
+    """Column query behind the log export; pass a filtered ReminderLog query
+    (e.g. the /logs filters) to narrow it."""
+    query = query if query is not None else ReminderLog.query
+    return (
+        query.join(Schedule, ReminderLog.schedule_id == Schedule.id)
+        .with_entities(
+            ReminderLog.id,
+            ReminderLog.schedule_id,
+            Schedule.entity_name,
+            Schedule.report_name,
+            ReminderLog.planned_due_date,
+            ReminderLog.reminder_offset_days,
+            ReminderLog.status,
+            ReminderLog.sent_at,
+            ReminderLog.backfilled,
+            ReminderLog.retry_count,
+            ReminderLog.error_message,
+        )
+        .order_by(ReminderLog.id)
+    )
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        return None
+
+
+def log_filters(args) -> dict:
+    """The log filters (schedule_id, status, date_from, date_to) from query
+    string arguments; unparsable values are ignored."""
+    return {
+        "schedule_id": args.get("schedule_id", type=int),
+        "status": args.get("status", "").strip().upper() or None,
+        "date_from": _parse_date(args.get("date_from")),
+        "date_to": _parse_date(args.get("date_to")),
+    }
+
+
+def filter_logs(schedule_id=None, status=None, date_from=None, date_to=None, query=None):
+    """ReminderLog query narrowed by the log filters; dates are sent_at days."""
+    query = query if query is not None else ReminderLog.query
+    if schedule_id:
+        query = query.filter(ReminderLog.schedule_id == schedule_id)
+    if status:
+        query = query.filter(ReminderLog.status == status)
+    if date_from:
+        query = query.filter(ReminderLog.sent_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(ReminderLog.sent_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return query
+
+
+def export_logs(fmt: str = "csv", query=None):
+    return _stream(log_export_query(query), LOG_FIELDS, fmt)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk import/export of schedules and reminder logs.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="import schedules from CSV or JSONL")
+    imp.add_argument("file", help="path, or - for stdin")
+    imp.add_argument("--format", choices=("csv", "jsonl"))
+    exp = sub.add_parser("export", help="export schedules or logs")
+    exp.add_argument("what", choices=("schedules", "logs"))
+    exp.add_argument("--format", choices=("csv", "jsonl"))
+    exp.add_argument("-o", "--output", default="-", help="path, or - for stdout")
+    exp.add_argument("--status", help="logs only: export this status")
+    args = ap.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "import":
+            fmt = args.format or detect_format(args.file)
+            if args.file == "-":
+                result = import_schedules(sys.stdin, fmt)
+            else:
+                with open(args.file, newline="", encoding="utf-8-sig") as f:
+                    result = import_schedules(f, fmt)
+            for line_no, message in result.errors:
+                print(f"line {line_no}: {message}", file=sys.stderr)
+            print(f"{result.inserted} schedule(s) imported, {result.error_count} row(s) rejected")
+            return 1 if result.error_count else 0
+
+        fmt = args.format or detect_format(args.output)
+        if args.what == "schedules":
+            chunks = export_schedules(fmt)
+        else:
+            query = ReminderLog.query
+            if args.status:
+                query = query.filter(ReminderLog.status == args.status.upper())
+            chunks = export_logs(fmt, query)
+        out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Read-through cache for the dashboard, schedule list and log pages.
+
+Entries are keyed by the page's arguments plus the current version of each
+table the page reads. Every committed write to a watched table bumps that
+table's version (see `track_writes`), so a changed table simply stops
+matching the old keys. Entries also expire after CACHE_TTL_SECONDS, which
+bounds staleness when the write happened in another process and the store
+is process-local. Values are plain snapshots, never ORM instances.
+
+The store is an in-process TTL/LRU dict by default. With CACHE_URL set to a
+redis:// URL, entries and versions live in Redis and are shared by every
+worker; the redis package is only needed then.
+"""
+import hashlib
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from itertools import chain
+from types import SimpleNamespace
+from sqlalchemy import event
+from config import Config
+
+# Tables whose writes invalidate cached pages.
+WATCHED_TABLES = ("schedules", "reminder_logs", "planned_reminders", "reminder_log_rollups")
+
+
+class LocalStore:
+    """Thread-safe TTL/LRU dict; versions are kept apart and never evicted."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def versions(self, names):
+        with self._lock:
+            return tuple(self._versions.get(name, 0) for name in names)
+
+    def bump(self, name: str):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisStore:
+    """The same interface on a shared Redis; values are pickled."""
+
+    prefix = "reminder-cache:"
+
+    def __init__(self, url: str):
+        import redis  # optional: only needed when CACHE_URL is set
+
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str):
+        raw = self._redis.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value, ttl: int):
+        self._redis.setex(self.prefix + key, ttl, pickle.dumps(value))
+
+    def versions(self, names):
+        raw = self._redis.mget([f"{self.prefix}v:{name}" for name in names])
+        return tuple(int(v or 0) for v in raw)
+
+    def bump(self, name: str):
+        self._redis.incr(f"{self.prefix}v:{name}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RedisStore(Config.CACHE_URL) if Config.CACHE_URL else LocalStore(Config.CACHE_MAX_ENTRIES)
+    return _store
+
+
+def enabled() -> bool:
+    return Config.CACHE_TTL_SECONDS > 0
+
+
+def bump(*tables):
+    """Invalidate every cached page that read one of `tables`."""
+    store = get_store()
+    for name in tables:
+        store.bump(name)
+
+
+def cached(name: str, tables, args, compute):
+    """Return (value, etag) for the page `name` with `args`, calling
+    `compute()` on a miss. The etag is minted per computed entry, so it
+    changes whenever the page is recomputed. With the cache disabled the
+    etag is None."""
+    if not enabled():
+        return compute(), None
+    store = get_store()
+    versions = store.versions(tables)
+    key = f"{name}:{hashlib.sha1(repr((args, versions)).encode()).hexdigest()}"
+    entry = store.get(key)
+    if entry is None:
+        entry = (compute(), uuid.uuid4().hex[:20])
+        store.set(key, entry, Config.CACHE_TTL_SECONDS)
+    return entry
+
+
+def snapshot(obj, fields, **extra) -> SimpleNamespace:
+    """Plain copy of `fields` of an ORM row, safe to keep across sessions."""
+    return SimpleNamespace(**{f: getattr(obj, f) for f in fields}, **extra)
+
+
+def _mark(session, table_name: str):
+    if table_name in WATCHED_TABLES:
+        session.info.setdefault("cache_dirty", set()).add(table_name)
+
+
+def _on_statement(state):
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return None
+    table = getattr(state.statement, "table", None)
+    if table is None or table.name not in WATCHED_TABLES:
+        return None
+    result = state.invoke_statement()
+    if getattr(result, "rowcount", -1) != 0:
+        _mark(state.session, table.name)
+    return result
+
+
+def _on_flush(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        _mark(session, getattr(obj, "__tablename__", None))
+
+
+def _on_commit(session):
+    dirty = session.info.pop("cache_dirty", None)
+    if dirty:
+        bump(*dirty)
+
+
+def _on_rollback(session):
+    session.info.pop("cache_dirty", None)
+
+
+_LISTENERS = (
+    ("do_orm_execute", _on_statement),
+    ("after_flush", _on_flush),
+    ("after_commit", _on_commit),
+    ("after_rollback", _on_rollback),
+)
+
+
+def track_writes(session):
+    """Bump the version of each watched table a transaction on `session`
+    (a Session class or scoped_session) wrote to, once it commits. Covers
+    ORM flushes and Core/bulk statements run through the session;
+    statements that matched no rows do not count. Safe to call again."""
+    for name, fn in _LISTENERS:
+        if not event.contains(session, name, fn):
+            event.listen(session, name, fn)
@@ -10,6 +10,9 @@ class Config:
 
     # Timezone
     APP_TZ = os.getenv("APP_TZ", "Asia/Jakarta")
+    # Zones a schedule may be assigned to (WIB, WITA, WIT); the daily job runs
+    # once per zone at DAILY_JOB_HOUR:DAILY_JOB_MINUTE local time
+    SCHEDULE_TIMEZONES = [x.strip() for x in os.getenv("SCHEDULE_TIMEZONES", "Asia/Jakarta,Asia/Makassar,Asia/Jayapura").split(",") if x.strip()]
 
     # SMTP
     SMTP_HOST = os.getenv("SMTP_HOST", "")
@@ -22,14 +25,79 @@ class Config:
 
     EMAIL_DRY_RUN = os.getenv("EMAIL_DRY_RUN", "true").lower() == "true"
 
+    # SMTP connection pool
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+    SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60"))
+    SMTP_NOOP_AFTER_SECONDS = float(os.getenv("SMTP_NOOP_AFTER_SECONDS", "5"))
+
+    # Concurrent dispatch: parallel senders and per-SMTP-host rate limit (0 = unlimited)
+    SEND_WORKERS = int(os.getenv("SEND_WORKERS", "4"))
+    SMTP_RATE_PER_SECOND = float(os.getenv("SMTP_RATE_PER_SECOND", "0"))
+    SMTP_RATE_BURST = int(os.getenv("SMTP_RATE_BURST", "10"))
+
+    # Outbox: the scheduler and routes enqueue, workers (`python -m worker`) send
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+    OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+    # Also drain the outbox from the web process (single-process deployments)
+    OUTBOX_EMBEDDED_WORKER = os.getenv("OUTBOX_EMBEDDED_WORKER", "true").lower() == "true"
+
     # Reminders
     DEFAULT_REMINDER_OFFSETS = [int(x.strip()) for x in os.getenv("DEFAULT_REMINDER_OFFSETS", "7,3,1,0").split(",") if x.strip()]
     DAILY_JOB_HOUR = int(os.getenv("DAILY_JOB_HOUR", "8"))
     DAILY_JOB_MINUTE = int(os.getenv("DAILY_JOB_MINUTE", "0"))
     MISSED_SCAN_DAYS = int(os.getenv("MISSED_SCAN_DAYS", "7"))
+    # Rendered reminder bodies kept in memory, keyed by (schedule, updated_at, due, offset)
+    EMAIL_RENDER_CACHE_SIZE = int(os.getenv("EMAIL_RENDER_CACHE_SIZE", "2048"))
+    # Digest mode: one combined email per recipient set per run instead of one
+    # per (schedule, due, offset); each item still gets its own ReminderLog row
+    DIGEST_MODE = os.getenv("DIGEST_MODE", "false").lower() == "true"
+    # How many days ahead planned_reminders is materialized
+    PLAN_HORIZON_DAYS = int(os.getenv("PLAN_HORIZON_DAYS", "60"))
+
+    # Retention: logs older than this many days (0 = keep forever) move to
+    # gzip JSONL files per month under LOG_ARCHIVE_DIR; runs daily at the hour
+    LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "0"))
+    LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "instance/archive")
+    RETENTION_JOB_HOUR = int(os.getenv("RETENTION_JOB_HOUR", "2"))
+
+    # Job run ledger: a RUNNING run without a heartbeat for this long counts
+    # as dead and the next run with the same window resumes from its checkpoint
+    JOB_RUN_STALE_MINUTES = int(os.getenv("JOB_RUN_STALE_MINUTES", "15"))
+
+    # Rows per page on the dashboard and /logs (keyset pagination, capped at 200)
+    PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+    # Cached dashboard/schedule/log pages: lifetime (0 disables), local entries,
+    # and an optional shared store (redis://...) for multi-process deployments
+    CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "30"))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+    CACHE_URL = os.getenv("CACHE_URL", "")
+
+    # Batching for the daily job: reminders claimed and logged per transaction
+    LOG_WRITE_CHUNK_SIZE = int(os.getenv("LOG_WRITE_CHUNK_SIZE", "200"))
+    # A SENDING claim older than this is treated as an interrupted send
+    SEND_CLAIM_TIMEOUT_MINUTES = int(os.getenv("SEND_CLAIM_TIMEOUT_MINUTES", "30"))
+
+    # Startup: the module-level `app` (gunicorn app:app, python app.py) starts the
+    # scheduler when enabled; create_app() itself never does unless asked.
+    SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    # Run today's scan + missed backfill in the background once the leader is elected
+    STARTUP_CATCH_UP = os.getenv("STARTUP_CATCH_UP", "true").lower() == "true"
+
+    # Expose /metrics and record job/SMTP/DB timings (off: instrumentation is a no-op)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+
+    # Leader election: only the lease holder runs the daily job under multi-worker servers
+    LEADER_LEASE_SECONDS = int(os.getenv("LEADER_LEASE_SECONDS", "60"))
+    LEADER_HEARTBEAT_SECONDS = int(os.getenv("LEADER_HEARTBEAT_SECONDS", "15"))
 
     # Retry logic for failed reminders
     MAX_RETRY_ATTEMPTS = int(os.getenv("MAX_RETRY_ATTEMPTS", "3"))
     RETRY_BACKOFF_BASE_MINUTES = int(
         os.getenv("RETRY_BACKOFF_BASE_MINUTES", "15")
     )
+    # Backoff is spread by +/- this fraction
+    RETRY_JITTER = float(os.getenv("RETRY_JITTER", "0.2"))
+    # How often the leader looks for retries that have come due
+    RETRY_POLL_SECONDS = int(os.getenv("RETRY_POLL_SECONDS", "60"))
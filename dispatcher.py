@@ -0,0 +1,93 @@
+"""Concurrent send stage for the daily job.
+
+The scheduler renders and claims reminders on its own thread (the database
+session is not thread-safe), hands the finished emails to `dispatch`, and
+writes the returned results back to ReminderLog in batches.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, NamedTuple
+
+from config import Config
+from mailer import send_email
+
+
+class OutgoingEmail(NamedTuple):
+    ref: Any                 # caller's handle for the result, e.g. a ReminderLog id
+    to_emails: List[str]
+    cc_emails: List[str]
+    bcc_emails: List[str]
+    subject: str
+    html: str
+    text: str
+
+
+class SendResult(NamedTuple):
+    ref: Any
+    ok: bool
+    error: str | None
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(host: str) -> TokenBucket | None:
+    """One shared bucket per SMTP host, or None when rate limiting is off."""
+    if Config.SMTP_RATE_PER_SECOND <= 0:
+        return None
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(Config.SMTP_RATE_PER_SECOND, Config.SMTP_RATE_BURST)
+        return bucket
+
+
+def _send_one(email: OutgoingEmail, limiter: TokenBucket | None, send: Callable) -> SendResult:
+    if limiter is not None:
+        limiter.acquire()
+    try:
+        ok, err = send(
+            email.to_emails, email.cc_emails, email.subject, email.html, email.text,
+            bcc_emails=email.bcc_emails,
+        )
+    except Exception as e:
+        ok, err = False, str(e)
+    return SendResult(email.ref, ok, None if ok else str(err))
+
+
+def dispatch(emails: List[OutgoingEmail], workers: int | None = None, send: Callable = send_email) -> List[SendResult]:
+    """Send `emails` through a bounded worker pool and return one result per
+    email, in input order."""
+    if not emails:
+        return []
+    workers = max(1, min(workers or Config.SEND_WORKERS, len(emails)))
+    limiter = get_rate_limiter(Config.SMTP_HOST)
+    if workers == 1:
+        return [_send_one(e, limiter, send) for e in emails]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reminder-send") as pool:
+        return list(pool.map(lambda e: _send_one(e, limiter, send), emails))
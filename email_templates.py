@@ -0,0 +1,109 @@
+"""Reminder email content rendered from the Jinja templates in templates/email/.
+
+Templates are compiled once per process. A schedule can override any of them
+with a file of the same name in templates/email/schedule_<id>/. Rendered
+reminders are kept in an LRU keyed by (schedule_id, updated_at, due, offset),
+so retries and repeated scans reuse the body while an edited schedule (new
+updated_at) renders afresh. HTML templates are autoescaped.
+"""
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from config import Config
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Fixed names instead of strftime("%A %B"), whose output follows the process locale.
+_DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December")
+
+
+def short_date(d) -> str:
+    return f"{d.day:02d} {_MONTHS[d.month - 1][:3]} {d.year}"
+
+
+def long_date(d) -> str:
+    return f"{_DAYS[d.weekday()]}, {d.day:02d} {_MONTHS[d.month - 1]} {d.year}"
+
+
+def reminder_label(offset_days: int) -> str:
+    return f"H-{offset_days}" if offset_days > 0 else ("HARI H" if offset_days == 0 else f"H+{abs(offset_days)}")
+
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,
+    trim_blocks=True,
+    keep_trailing_newline=True,
+)
+_env.filters["short_date"] = short_date
+_env.filters["long_date"] = long_date
+
+
+@lru_cache(maxsize=4096)
+def _template(schedule_id, name: str):
+    return _env.select_template([f"email/schedule_{schedule_id}/{name}", f"email/{name}"])
+
+
+def _render(schedule_id, kind: str, **context):
+    subject = _template(schedule_id, f"{kind}_subject.txt").render(**context)
+    return (
+        " ".join(subject.split()),  # one header line, whatever the data holds
+        _template(schedule_id, f"{kind}.html").render(**context),
+        _template(schedule_id, f"{kind}.txt").render(**context),
+    )
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered (subject, html, text) tuples."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_cache = RenderCache(Config.EMAIL_RENDER_CACHE_SIZE)
+
+
+def render_reminder(schedule, due_date, offset_days: int):
+    """(subject, html, text) for one reminder. `schedule` may be a Schedule
+    or a column row carrying the same attributes, including updated_at."""
+    key = (schedule.id, schedule.updated_at, due_date, offset_days)
+    content = _cache.get(key)
+    if content is None:
+        content = _render(schedule.id, "reminder", schedule=schedule, due=due_date,
+                          label=reminder_label(offset_days))
+        _cache.put(key, content)
+    return content
+
+
+def render_digest(items):
+    """(subject, html, text) combining several [(schedule, due, offset)]
+    items for the same recipients, listed by due date."""
+    items = sorted(items, key=lambda it: (it[1], it[0].entity_name, it[0].report_name))
+    return _render(None, "digest", items=[
+        dict(schedule=sch, due=due, label=reminder_label(off)) for sch, due, off in items
+    ])
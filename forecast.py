@@ -0,0 +1,192 @@
+"""Projected send volume for a date range, without sending or writing.
+
+Walks the active schedules in keyset chunks and expands each one with the
+same occurrence logic as the planner (`utils.send_dates_between`). The
+expansion is shared by every schedule with the same anchor, interval and
+offsets, which is what quarter-end spikes are made of, so a year over 10k
+schedules takes seconds. Counts follow the engine: one message per reminder,
+or with DIGEST_MODE one per recipient group per zone per day; deliveries
+are messages times their valid recipients.
+
+All mail leaves through the single SMTP_HOST relay; the per-domain counts
+are what the receiving relays see.
+
+    python -m forecast --days 90
+    python -m forecast --start 2025-03-01 --days 45 --top 20
+    python -m forecast --days 365 --json > forecast.json
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+from config import Config
+from models import db, Schedule
+from pagination import keyset_chunks
+from planner import local_today, schedule_offsets, schedule_tz
+from recipients import recipients_for
+from utils import send_dates_between
+
+# Longest range the /forecast endpoint accepts.
+MAX_FORECAST_DAYS = 731
+
+
+class DayVolume(NamedTuple):
+    reminders: int
+    messages: int
+    deliveries: int
+
+
+class Forecast(NamedTuple):
+    start: date
+    end: date
+    schedules: int
+    days: dict        # {date: DayVolume}, every day of the range
+    recipients: Counter  # deliveries per address
+    domains: Counter     # deliveries per recipient domain
+
+    def totals(self) -> DayVolume:
+        return DayVolume(*(sum(v) for v in zip(*self.days.values()))) if self.days else DayVolume(0, 0, 0)
+
+    def peak_day(self):
+        """(date, DayVolume) with the most messages, earliest on a tie."""
+        if not self.days:
+            return None
+        return max(self.days.items(), key=lambda item: (item[1].messages, -item[0].toordinal()))
+
+
+def _domain(email: str) -> str:
+    return email.rsplit("@", 1)[-1]
+
+
+def forecast(start: date, end: date) -> Forecast:
+    """Reminders, messages and deliveries that would go out per day in
+    [start, end] (local dates of each schedule's zone)."""
+    expansions = {}
+    reminders = Counter()
+    messages = Counter()
+    deliveries = Counter()
+    per_address = Counter()
+    digests = {}  # digest mode: {(send date, zone, recipient group): recipient count}
+    scheduled = 0
+    query = db.session.query(
+        Schedule.id, Schedule.anchor_due_date, Schedule.interval_months, Schedule.offsets, Schedule.timezone,
+    ).filter(Schedule.active.is_(True))
+    for chunk in keyset_chunks(query, Schedule.id, Config.LOG_WRITE_CHUNK_SIZE):
+        recipients = recipients_for(sch.id for sch in chunk)
+        for sch in chunk:
+            key = (sch.anchor_due_date, sch.interval_months, tuple(schedule_offsets(sch)))
+            sends = expansions.get(key)
+            if sends is None:
+                sends = expansions[key] = [
+                    send_date for _, _, send_date
+                    in send_dates_between(sch.anchor_due_date, sch.interval_months, key[2], start, end)
+                ]
+            if not sends:
+                continue
+            scheduled += 1
+            rcpt = recipients[sch.id]
+            addresses = rcpt.to + rcpt.cc
+            if Config.DIGEST_MODE:
+                group = (tuple(sorted(rcpt.to)), tuple(sorted(rcpt.cc)))
+                for send_date in sends:
+                    reminders[send_date] += 1
+                    digests[(send_date, schedule_tz(sch), group)] = len(addresses)
+                continue
+            for send_date in sends:
+                reminders[send_date] += 1
+                messages[send_date] += 1
+                deliveries[send_date] += len(addresses)
+            for email in addresses:
+                per_address[email] += len(sends)
+        db.session.expunge_all()
+
+    for (send_date, _, (to, cc)), count in digests.items():
+        messages[send_date] += 1
+        deliveries[send_date] += count
+        for email in to + cc:
+            per_address[email] += 1
+
+    per_domain = Counter()
+    for email, count in per_address.items():
+        per_domain[_domain(email)] += count
+    days = {}
+    day = start
+    while day <= end:
+        days[day] = DayVolume(reminders[day], messages[day], deliveries[day])
+        day += timedelta(days=1)
+    return Forecast(start, end, scheduled, days, per_address, per_domain)
+
+
+def as_dict(result: Forecast, top: int = 10) -> dict:
+    """JSON-ready summary: the daily histogram, totals, peak day, top
+    recipients and domains, and the relay's estimated peak-day send time."""
+    peak = result.peak_day()
+    totals = result.totals()
+    rate = Config.SMTP_RATE_PER_SECOND
+    return {
+        "start": result.start.isoformat(),
+        "end": result.end.isoformat(),
+        "digest_mode": Config.DIGEST_MODE,
+        "schedules": result.schedules,
+        "totals": totals._asdict(),
+        "peak_day": {"date": peak[0].isoformat(), **peak[1]._asdict()} if peak else None,
+        "relay": {
+            "host": Config.SMTP_HOST or None,
+            "rate_per_second": rate or None,
+            "peak_day_send_seconds": round(peak[1].messages / rate, 1) if peak and rate else None,
+        },
+        "days": [{"date": d.isoformat(), **v._asdict()} for d, v in result.days.items()],
+        "top_recipients": [{"email": e, "deliveries": n} for e, n in result.recipients.most_common(top)],
+        "top_domains": [{"domain": d, "deliveries": n} for d, n in result.domains.most_common(top)],
+    }
+
+
+def _print_report(result: Forecast, top: int):
+    totals = result.totals()
+    print(f"{result.start} .. {result.end}: {result.schedules} schedule(s), {totals.reminders} reminder(s), "
+          f"{totals.messages} message(s), {totals.deliveries} delivery(ies)"
+          + (" [digest]" if Config.DIGEST_MODE else ""))
+    peak = result.peak_day()
+    scale = max(1, peak[1].messages) if peak else 1
+    print("\ndate        messages  deliveries")
+    for day, v in result.days.items():
+        if v.messages:
+            print(f"{day}  {v.messages:8d}  {v.deliveries:10d}  {'#' * max(1, round(40 * v.messages / scale))}")
+    if peak and peak[1].messages:
+        line = f"\npeak: {peak[0]} with {peak[1].messages} message(s)"
+        if Config.SMTP_RATE_PER_SECOND:
+            line += f", ~{peak[1].messages / Config.SMTP_RATE_PER_SECOND / 60:.1f} min at SMTP_RATE_PER_SECOND"
+        print(line)
+    print(f"\ntop {top} recipients")
+    for email, n in result.recipients.most_common(top):
+        print(f"{n:8d}  {email}")
+    print(f"\ntop {top} domains")
+    for domain, n in result.domains.most_common(top):
+        print(f"{n:8d}  {domain}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Project reminder volume per day, recipient and domain.")
+    ap.add_argument("--start", help="first day, YYYY-MM-DD (default today)")
+    ap.add_argument("--days", type=int, default=90, help="length of the range in days")
+    ap.add_argument("--top", type=int, default=10, help="recipients and domains to list")
+    ap.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = ap.parse_args()
+
+    from app import create_app
+
+    with create_app().app_context():
+        start = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else local_today()
+        result = forecast(start, start + timedelta(days=max(1, args.days) - 1))
+    if args.json:
+        json.dump(as_dict(result, args.top), sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        _print_report(result, args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
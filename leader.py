@@ -0,0 +1,140 @@
+"""Leader election for the scheduler.
+
+Every web worker starts a scheduler, but only the process holding the lease
+runs the daily job and the catch-up scans. On Postgres the lease is a
+session-level advisory lock on a dedicated connection, released by the
+server as soon as that connection dies. Elsewhere (SQLite) it is a row in
+scheduler_leases that the holder renews on every heartbeat and that any
+process may take over once it expires.
+
+Only the heartbeat job acquires or renews the lease; the leader-only jobs
+just check `holds()`. The scheduler runs jobs on several threads, so
+heartbeat() and release() are serialized by a lock.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import text, update
+from config import Config
+from models import db, SchedulerLease, insert_or_ignore
+
+
+class LeaderLease:
+    def __init__(self, name: str = "reminder-scheduler", owner: str | None = None):
+        self.name = name
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+        self._conn = None  # Postgres: connection holding the advisory lock
+        self._valid_until = 0.0  # lease row: monotonic time it expires at
+        self._lock = threading.Lock()
+
+    def holds(self) -> bool:
+        """Whether this process is leader, without touching the database. A
+        lease row counts only until its expiry, so a process that stalled past
+        it does not run leader-only work before its next heartbeat."""
+        return self.is_leader and (self._conn is not None or time.monotonic() < self._valid_until)
+
+    # Postgres advisory lock
+
+    def _advisory_key(self) -> int:
+        return zlib.crc32(self.name.encode())
+
+    def _heartbeat_advisory(self) -> bool:
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                logging.warning("Lost the scheduler lock connection; giving up leadership")
+                self._drop_conn()
+        conn = db.engine.connect()
+        got = conn.execute(
+            text("SELECT pg_try_advisory_lock(:k)"), {"k": self._advisory_key()}
+        ).scalar()
+        conn.commit()
+        if got:
+            self._conn = conn
+            return True
+        conn.close()
+        return False
+
+    def _drop_conn(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    # Lease row
+
+    def _heartbeat_row(self) -> bool:
+        started = time.monotonic()
+        now = datetime.utcnow()
+        db.session.execute(insert_or_ignore(SchedulerLease, "name"), [dict(name=self.name)])
+        result = db.session.execute(
+            update(SchedulerLease)
+            .where(
+                SchedulerLease.name == self.name,
+                (SchedulerLease.owner == self.owner)
+                | SchedulerLease.owner.is_(None)
+                | (SchedulerLease.expires_at < now),
+            )
+            .values(owner=self.owner, expires_at=now + timedelta(seconds=Config.LEADER_LEASE_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            return False
+        self._valid_until = started + Config.LEADER_LEASE_SECONDS
+        return True
+
+    def heartbeat(self) -> bool:
+        """Acquire or renew the lease. Returns True only on the transition to
+        leader, so the caller can run its catch-up work once per takeover."""
+        with self._lock:
+            return self._heartbeat()
+
+    def _heartbeat(self) -> bool:
+        was_leader = self.is_leader
+        try:
+            if db.engine.dialect.name == "postgresql":
+                self.is_leader = self._heartbeat_advisory()
+            else:
+                self.is_leader = self._heartbeat_row()
+        except Exception as e:
+            db.session.rollback()
+            logging.warning("Scheduler lease heartbeat failed: %s", e)
+            self.is_leader = False
+        if was_leader and not self.is_leader:
+            logging.warning("Scheduler lease %s lost by %s", self.name, self.owner)
+        if self.is_leader and not was_leader:
+            logging.info("Scheduler lease %s acquired by %s", self.name, self.owner)
+        return self.is_leader and not was_leader
+
+    def release(self):
+        with self._lock:
+            self._release()
+
+    def _release(self):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            if self._conn is not None:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": self._advisory_key()})
+                self._conn.commit()
+                self._drop_conn()
+            else:
+                db.session.execute(
+                    update(SchedulerLease)
+                    .where(SchedulerLease.name == self.name, SchedulerLease.owner == self.owner)
+                    .values(owner=None, expires_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+        except Exception as e:
+            logging.warning("Releasing scheduler lease failed: %s", e)
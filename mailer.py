@@ -1,9 +1,277 @@
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import base64
+import threading
+import time
+import uuid
+from functools import lru_cache
 from typing import List
 from config import Config
 import logging
+import metrics
+
+
+class _PooledConnection:
+    """An authenticated SMTP session plus the bookkeeping the pool needs."""
+
+    def __init__(self, server):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP sessions alive and hands them out for reuse.
+
+    A connection is recycled after `max_messages` sends, dropped when it has
+    been idle longer than `idle_timeout` seconds, and NOOP-checked before reuse
+    when it has been idle for more than `noop_after` seconds. Sessions that
+    are checked out when the pool is closed are quit as they come back.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = True,
+        max_size: int = 4,
+        max_messages: int = 100,
+        idle_timeout: float = 60.0,
+        noop_after: float = 5.0,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self.timeout = timeout
+        self._idle: list[_PooledConnection] = []
+        self._in_use: set[_PooledConnection] = set()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self) -> _PooledConnection:
+        import smtplib
+
+        with metrics.SMTP_SECONDS.time(phase="connect"):
+            if self.use_tls:
+                server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+                server.ehlo()
+                server.starttls()
+                server.ehlo()
+            else:
+                server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        if self.username:
+            with metrics.SMTP_SECONDS.time(phase="login"):
+                server.login(self.username, self.password)
+        return _PooledConnection(server)
+
+    def _is_healthy(self, conn: _PooledConnection) -> bool:
+        import smtplib
+
+        idle = time.monotonic() - conn.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle > self.noop_after:
+            try:
+                code, _ = conn.server.noop()
+                return code == 250
+            except smtplib.SMTPException:
+                return False
+            except OSError:
+                return False
+        return True
+
+    def _check_out(self, conn: _PooledConnection) -> _PooledConnection:
+        with self._lock:
+            self._in_use.add(conn)
+        return conn
+
+    def _discard(self, conn: _PooledConnection):
+        with self._lock:
+            self._in_use.discard(conn)
+        conn.close()
+
+    def _acquire(self) -> _PooledConnection:
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._check_out(self._connect())
+                if self._is_healthy(conn):
+                    return self._check_out(conn)
+                conn.close()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, conn: _PooledConnection | None):
+        try:
+            if conn is None:
+                return
+            conn.last_used = time.monotonic()
+            with self._lock:
+                self._in_use.discard(conn)
+                keep = not self._closed and conn.sent < self.max_messages
+                if keep:
+                    self._idle.append(conn)
+            if not keep:
+                conn.close()
+        finally:
+            self._slots.release()
+
+    def sendmail(self, from_addr: str, to_addrs: List[str], message: str):
+        """Send one message over a pooled session, reconnecting once if the
+        server dropped the connection underneath us."""
+        import smtplib
+
+        conn = self._acquire()
+        try:
+            try:
+                with metrics.SMTP_SECONDS.time(phase="send"):
+                    conn.server.sendmail(from_addr, to_addrs, message)
+            except smtplib.SMTPServerDisconnected:
+                self._discard(conn)
+                conn = None
+                conn = self._check_out(self._connect())
+                with metrics.SMTP_SECONDS.time(phase="send"):
+                    conn.server.sendmail(from_addr, to_addrs, message)
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                conn.sent += 1
+            self._release(conn)
+
+    def close_all(self) -> int:
+        """Mark the pool closed and quit its idle sessions. Sessions checked
+        out right now are quit by `_release` when their send finishes.
+        Returns how many were checked out."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            in_use = len(self._in_use)
+        for conn in idle:
+            conn.close()
+        return in_use
+
+
+_pool: SMTPConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool(
+                Config.SMTP_HOST,
+                Config.SMTP_PORT,
+                Config.SMTP_USERNAME,
+                Config.SMTP_PASSWORD,
+                use_tls=Config.SMTP_USE_TLS,
+                # every dispatch worker should be able to hold a session
+                max_size=max(Config.SMTP_POOL_SIZE, Config.SEND_WORKERS),
+                max_messages=Config.SMTP_MAX_MESSAGES_PER_CONNECTION,
+                idle_timeout=Config.SMTP_IDLE_TIMEOUT_SECONDS,
+                noop_after=Config.SMTP_NOOP_AFTER_SECONDS,
+            )
+        return _pool
+
+
+def close_smtp_pool():
+    """Close the pool; call at the end of a batch run. Idle sessions are quit
+    now, sessions still sending are quit when they are released, and the
+    next send opens a fresh pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        in_use = pool.close_all()
+        if in_use:
+            logging.info("SMTP pool closed with %d session(s) still sending; they quit when done", in_use)
+
+
+class _MessageSkeleton:
+    """The fixed parts of a multipart/alternative (text + HTML) message,
+    built once; each send only fills in Subject/To/Cc and the two bodies."""
+
+    def __init__(self, sender_name: str, sender_email: str):
+        from email.utils import formataddr
+
+        self.boundary = "=_reminder_" + uuid.uuid4().hex
+        self.from_header = formataddr((sender_name, sender_email))
+
+    def _part(self, subtype: str, body: str) -> str:
+        if body.isascii() and all(len(line) <= 998 for line in body.splitlines()):
+            return (f'Content-Type: text/{subtype}; charset="us-ascii"\n'
+                    f"Content-Transfer-Encoding: 7bit\n\n{body}\n")
+        encoded = base64.encodebytes(body.encode("utf-8")).decode("ascii")
+        return (f'Content-Type: text/{subtype}; charset="utf-8"\n'
+                f"Content-Transfer-Encoding: base64\n\n{encoded}")
+
+    def render(self, to_header: str, cc_header: str | None, subject: str, html: str, text: str) -> str:
+        from email.header import Header
+
+        boundary = self.boundary
+        if boundary in html or boundary in text:
+            boundary = "=_reminder_" + uuid.uuid4().hex
+        subject = " ".join(subject.split())
+        if not subject.isascii():
+            subject = Header(subject, "utf-8").encode()
+        headers = [
+            f'Content-Type: multipart/alternative; boundary="{boundary}"',
+            "MIME-Version: 1.0",
+            f"Subject: {subject}",
+            f"From: {self.from_header}",
+            f"To: {to_header}",
+        ]
+        if cc_header:
+            headers.append(f"Cc: {cc_header}")
+        return (
+            "\n".join(headers) + "\n\n"
+            f"--{boundary}\n{self._part('plain', text)}"
+            f"--{boundary}\n{self._part('html', html)}"
+            f"--{boundary}--\n"
+        )
+
+
+@lru_cache(maxsize=1)
+def _skeleton(sender_name: str, sender_email: str) -> _MessageSkeleton:
+    return _MessageSkeleton(sender_name, sender_email)
+
+
+def build_message(to_emails: List[str], cc_emails: List[str], subject: str, html_body: str, text_body: str = None) -> str:
+    """The wire form of one reminder. Bcc recipients are never written into
+    the headers; they only go into the SMTP envelope."""
+    return _skeleton(Config.SENDER_NAME, Config.SENDER_EMAIL).render(
+        ", ".join(to_emails) if to_emails else Config.SENDER_EMAIL,
+        ", ".join(cc_emails) if cc_emails else None,
+        subject,
+        html_body,
+        text_body or "",
+    )
+
 
 def send_email(
     to_emails: List[str],
@@ -22,34 +290,16 @@ def send_email(
             subject,
         )
         logging.debug("Body (HTML):\n%s", html_body)
+        metrics.EMAILS.inc(result="dry_run")
         return True, None
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = subject
-    msg["From"] = f"{Config.SENDER_NAME} <{Config.SENDER_EMAIL}>"
-    msg["To"] = ", ".join(to_emails) if to_emails else Config.SENDER_EMAIL
-    if cc_emails:
-        msg["Cc"] = ", ".join(cc_emails)
-    # Do not add Bcc header to avoid exposing recipients
-
-    part1 = MIMEText(text_body or "", "plain")
-    part2 = MIMEText(html_body, "html")
-    msg.attach(part1)
-    msg.attach(part2)
+    message = build_message(to_emails, cc_emails, subject, html_body, text_body)
 
     try:
-        if Config.SMTP_USE_TLS:
-            server = smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT)
-            server.ehlo()
-            server.starttls()
-            server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
-        else:
-            server = smtplib.SMTP_SSL(Config.SMTP_HOST, Config.SMTP_PORT)
-            server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
-
         all_rcpts = to_emails + (cc_emails or []) + (bcc_emails or [])
-        server.sendmail(Config.SENDER_EMAIL, all_rcpts, msg.as_string())
-        server.quit()
+        get_smtp_pool().sendmail(Config.SENDER_EMAIL, all_rcpts, message)
+        metrics.EMAILS.inc(result="sent")
         return True, None
     except Exception as e:
+        metrics.EMAILS.inc(result="failed", error_class=type(e).__name__)
         return False, str(e)
@@ -0,0 +1,219 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Everything is a no-op unless METRICS_ENABLED is set: recording calls return
+after one flag check and no SQLAlchemy listeners are installed. Values are
+per process; scrape each worker (or run the scheduler in a single process)
+when running several.
+"""
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+from config import Config
+
+_enabled = Config.METRICS_ENABLED
+_NULL = nullcontext()
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_registry = []
+_collectors = []
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = on
+
+
+def _label_text(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self._samples():
+            lines.append(f"{name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        if not _enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * len(self.buckets) + [0, 0.0]  # buckets, count, sum
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def time(self, **labels):
+        """Context manager observing the elapsed seconds of its block."""
+        if not _enabled:
+            return _NULL
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for _, key, counts in self._samples():
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + ('+Inf',))} {counts[-2]}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {counts[-2]}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {counts[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+# --- catalog ---------------------------------------------------------------
+
+JOB_SECONDS = Histogram("reminder_job_duration_seconds", "Duration of scheduler job runs.", ["job"])
+JOB_LAST_SUCCESS = Gauge("reminder_job_last_success_timestamp_seconds", "Unix time of the last successful run.", ["job"])
+JOB_FAILURES = Counter("reminder_job_failures_total", "Scheduler job runs that raised.", ["job"])
+PHASE_SECONDS = Histogram("reminder_phase_duration_seconds",
+                          "Time spent planning, enqueueing and dispatching reminders.", ["phase"])
+SCHEDULES_SCANNED = Counter("reminder_schedules_scanned_total", "Distinct schedules among evaluated candidates.")
+CANDIDATES = Counter("reminder_candidates_total", "Planned reminders evaluated, by outcome.", ["outcome"])
+DB_QUERIES = Counter("reminder_db_queries_total", "SQL statements executed.")
+DB_QUERY_SECONDS = Histogram("reminder_db_query_duration_seconds", "SQL statement latency.",
+                             buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0))
+SMTP_SECONDS = Histogram("reminder_smtp_duration_seconds", "SMTP latency by phase (connect, login, send).", ["phase"])
+EMAILS = Counter("reminder_emails_total", "Send attempts by result and error class.", ["result", "error_class"])
+
+
+def timed_job(job: str):
+    """Decorator recording duration, last success and failures of a job."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                JOB_FAILURES.inc(job=job)
+                raise
+            finally:
+                JOB_SECONDS.observe(time.perf_counter() - start, job=job)
+            JOB_LAST_SUCCESS.set(time.time(), job=job)
+            return result
+        return wrapper
+    return decorator
+
+
+def gauge_lines(name: str, help_text: str, samples, label: str | None = None):
+    """Exposition lines for a gauge computed at scrape time; `samples` is
+    [(label value, value)] or [(None, value)] when unlabelled."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for label_value, value in samples:
+        labels = _label_text((label,), (label_value,)) if label else ""
+        lines.append(f"{name}{labels} {value}")
+    return lines
+
+
+def register_collector(fn):
+    """`fn()` is called at scrape time and returns exposition lines."""
+    _collectors.append(fn)
+    return fn
+
+
+def instrument_engine(engine):
+    """Count and time every statement run on `engine`."""
+    from sqlalchemy import event
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["_metrics_start"].pop()
+        DB_QUERIES.inc()
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started)
+
+    def failed(context):
+        if context.connection is not None and context.connection.info.get("_metrics_start"):
+            context.connection.info["_metrics_start"].pop()
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    event.listen(engine, "handle_error", failed)
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,82 @@
+"""In-place schema upgrades for databases created by older versions.
+
+`db.create_all()` only creates missing tables, so columns and indexes added
+to existing tables have to be created here. Every step is idempotent and
+safe to run on each startup, for SQLite and Postgres alike.
+"""
+from datetime import datetime
+from sqlalchemy import select, text, update
+from config import Config
+from models import db, ReminderLog
+from recipients import backfill
+from utils import retry_backoff
+
+
+# Indexes replaced by wider ones; dropped from databases that still have them.
+_OBSOLETE_INDEXES = {
+    "reminder_logs": ["ix_reminder_logs_sent_at"],
+}
+
+
+def _dedupe_sent_logs(conn):
+    # The claimed-key unique index cannot be built while a key has several
+    # SENT rows. Keep the oldest and relabel the rest instead of deleting them.
+    conn.execute(text(
+        """
+        UPDATE reminder_logs SET status = 'DUPLICATE'
+        WHERE status = 'SENT' AND id NOT IN (
+            SELECT MIN(id) FROM reminder_logs WHERE status = 'SENT'
+            GROUP BY schedule_id, planned_due_date, reminder_offset_days
+        )
+        """
+    ))
+
+
+def _schedule_pending_retries(conn):
+    # FAILED rows from before next_attempt_at existed: give them the backoff
+    # the old daily pass would have applied, or retire them as DEAD.
+    logs = ReminderLog.__table__
+    rows = conn.execute(
+        select(logs.c.id, logs.c.retry_count, logs.c.sent_at)
+        .where(logs.c.status == "FAILED", logs.c.next_attempt_at.is_(None))
+    ).all()
+    for log_id, retry_count, sent_at in rows:
+        if retry_count >= Config.MAX_RETRY_ATTEMPTS:
+            values = dict(status="DEAD")
+        else:
+            values = dict(next_attempt_at=(sent_at or datetime.utcnow())
+                          + retry_backoff(retry_count, Config.RETRY_BACKOFF_BASE_MINUTES))
+        conn.execute(update(logs).where(logs.c.id == log_id).values(**values))
+
+
+def _add_missing_columns(conn, table):
+    # New columns are always nullable or carry a server-side default, so a
+    # plain ADD COLUMN works on both backends.
+    existing = {c["name"] for c in db.inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg}"
+        conn.execute(text(ddl))
+
+
+def upgrade_schema():
+    """Bring an existing database up to the current models. Call inside an
+    app context after `db.create_all()`."""
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            _add_missing_columns(conn, table)
+            existing = {ix["name"] for ix in db.inspect(conn).get_indexes(table.name)}
+            for name in _OBSOLETE_INDEXES.get(table.name, []):
+                if name in existing:
+                    conn.execute(text(f"DROP INDEX {name}"))
+            missing = [ix for ix in table.indexes if ix.name not in existing]
+            if table is ReminderLog.__table__ and any(ix.unique for ix in missing):
+                _dedupe_sent_logs(conn)
+            for ix in missing:
+                ix.create(conn)
+        _schedule_pending_retries(conn)
+        # Parsed offsets and recipient rows for schedules written before them
+        backfill(conn)
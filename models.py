@@ -1,10 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert_sentinel
 from datetime import datetime
 
 db = SQLAlchemy()
 
 class Schedule(db.Model):
     __tablename__ = "schedules"
+    __table_args__ = (
+        # Dashboard pages: active schedules by next due / by entity
+        db.Index("ix_schedules_active_next_due", "active", "next_due_date", "id"),
+        db.Index("ix_schedules_active_entity", "active", "entity_name", "id"),
+        # Bulk API upserts: match on (entity_name, report_name)
+        db.Index("ix_schedules_entity_report", "entity_name", "report_name"),
+    )
     id = db.Column(db.Integer, primary_key=True)
     entity_name = db.Column(db.String(200), nullable=False)    # e.g., Bank Neo Commerce
     report_name = db.Column(db.String(200), nullable=False)    # e.g., LBU, APU PPT
@@ -13,6 +21,8 @@ class Schedule(db.Model):
     # Recurrence
     anchor_due_date = db.Column(db.Date, nullable=False)       # first due date
     interval_months = db.Column(db.Integer, nullable=False, default=0)  # 0 = one-off; 1=monthly; 3=quarterly; 12=yearly; etc.
+    next_due_date = db.Column(db.Date, nullable=True)          # cached next_occurrence(); NULL once a one-off has passed
+    timezone = db.Column(db.String(64), nullable=True)         # IANA zone the dates are local to; NULL = APP_TZ
 
     # Recipients
     recipient_emails = db.Column(db.Text, nullable=False)      # comma-separated
@@ -20,21 +30,172 @@ class Schedule(db.Model):
 
     # Custom reminder offsets (days before due date). If empty, uses global default.
     reminder_offsets_days = db.Column(db.String(100), nullable=True)    # e.g., "7,3,1,0"
+    offsets = db.Column(db.JSON(none_as_null=True), nullable=True)      # parsed reminder_offsets_days, e.g. [7, 3, 1, 0]
 
     active = db.Column(db.Boolean, nullable=False, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class ScheduleRecipient(db.Model):
+    """One address of a schedule, normalized from recipient_emails/cc_emails
+    (see recipients.sync_schedule). The email index answers "which schedules
+    does this address receive"."""
+    __tablename__ = "schedule_recipients"
+    __table_args__ = (
+        db.UniqueConstraint("schedule_id", "email", name="uq_schedule_recipients_key"),
+        db.Index("ix_schedule_recipients_email", "email"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id'), nullable=False)
+    email = db.Column(db.String(320), nullable=False)              # trimmed and lowercased
+    role = db.Column(db.String(2), nullable=False)                 # to / cc
+    valid = db.Column(db.Boolean, nullable=False, default=True)    # passes the address check; invalid ones are never sent to
+
+# Statuses that own a (schedule, due, offset) key: at most one row per key may
+# be in one of them, which is what makes the send claim an insert-or-ignore.
+CLAIMED_STATUSES = ("SENT", "SENDING")
+CLAIMED_KEY_WHERE = db.text("status IN ('SENT', 'SENDING')")
+
 class ReminderLog(db.Model):
     __tablename__ = "reminder_logs"
+    __table_args__ = (
+        # Dedup lookups by key
+        db.Index("ix_reminder_logs_key_status", "schedule_id", "planned_due_date", "reminder_offset_days", "status"),
+        # /logs filtered by status
+        db.Index("ix_reminder_logs_status_sent_at", "status", "sent_at"),
+        # Retry job: FAILED rows whose next attempt has come due
+        db.Index("ix_reminder_logs_status_next_attempt", "status", "next_attempt_at"),
+        # Dashboard / logs keyset pagination, optionally per schedule
+        db.Index("ix_reminder_logs_sent_at_id", "sent_at", "id"),
+        db.Index("ix_reminder_logs_schedule_sent_at", "schedule_id", "sent_at", "id"),
+        db.Index(
+            "uq_reminder_logs_claimed_key",
+            "schedule_id", "planned_due_date", "reminder_offset_days",
+            unique=True,
+            sqlite_where=CLAIMED_KEY_WHERE,
+            postgresql_where=CLAIMED_KEY_WHERE,
+        ),
+    )
     id = db.Column(db.Integer, primary_key=True)
     schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id'), nullable=False)
     planned_due_date = db.Column(db.Date, nullable=False)          # the due date for which reminder was sent
     reminder_offset_days = db.Column(db.Integer, nullable=False)   # e.g., 7,3,1,0
-    status = db.Column(db.String(50), nullable=False)              # SENT / FAILED
+    status = db.Column(db.String(50), nullable=False)              # SENDING / SENT / FAILED / DEAD / SKIPPED / SUPERSEDED / DUPLICATE
     error_message = db.Column(db.Text, nullable=True)
     sent_at = db.Column(db.DateTime, default=datetime.utcnow)
     backfilled = db.Column(db.Boolean, nullable=False, default=False)
     retry_count = db.Column(db.Integer, nullable=False, default=0)
+    outbox_id = db.Column(db.Integer, db.ForeignKey('outbox_messages.id'), nullable=True, index=True)  # message carrying this reminder
+    next_attempt_at = db.Column(db.DateTime, nullable=True)        # FAILED only: when the retry job re-queues it
 
     schedule = db.relationship("Schedule", backref="reminders")
+
+class PlannedReminder(db.Model):
+    """Materialized send plan: one row per (schedule, due, offset) whose
+    send date falls inside the rolling planning horizon."""
+    __tablename__ = "planned_reminders"
+    __table_args__ = (
+        db.UniqueConstraint("schedule_id", "due_date", "offset_days", name="uq_planned_reminders_key"),
+        db.Index("ix_planned_reminders_send_date_status", "send_date", "status"),
+        db.Index("ix_planned_reminders_schedule_due", "schedule_id", "due_date"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id'), nullable=False)
+    due_date = db.Column(db.Date, nullable=False)
+    offset_days = db.Column(db.Integer, nullable=False)
+    send_date = db.Column(db.Date, nullable=False)                 # due_date - offset_days
+    status = db.Column(db.String(20), nullable=False, default="PENDING")  # PENDING / QUEUED / SENT / FAILED / SKIPPED
+
+    schedule = db.relationship("Schedule")
+
+class OutboxMessage(db.Model):
+    """A rendered email waiting to be sent by a worker.
+
+    Workers claim QUEUED rows (or SENDING rows whose lease expired) by
+    stamping lease_owner/lease_expires_at in a conditional UPDATE, so
+    several workers can drain the table without sending a row twice.
+    """
+    __tablename__ = "outbox_messages"
+    __table_args__ = (
+        db.Index("ix_outbox_messages_status_lease", "status", "lease_expires_at"),
+        # Lets enqueue() batch its INSERT ... RETURNING id in parameter order
+        # on SQLite too, instead of one statement per message.
+        insert_sentinel("insert_sentinel"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    to_emails = db.Column(db.Text, nullable=True)                  # comma-separated
+    cc_emails = db.Column(db.Text, nullable=True)
+    bcc_emails = db.Column(db.Text, nullable=True)
+    subject = db.Column(db.Text, nullable=False)
+    html_body = db.Column(db.Text, nullable=False)
+    text_body = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="QUEUED")  # QUEUED / SENDING / DONE / FAILED
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    lease_owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    error_message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+class SchedulerLease(db.Model):
+    """Leader lease row used when advisory locks are unavailable (SQLite)."""
+    __tablename__ = "scheduler_leases"
+    name = db.Column(db.String(100), primary_key=True)
+    owner = db.Column(db.String(100), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+
+class PlanHorizon(db.Model):
+    """Single row recording how far ahead planned_reminders has been filled."""
+    __tablename__ = "plan_horizon"
+    id = db.Column(db.Integer, primary_key=True)
+    planned_through = db.Column(db.Date, nullable=False)
+
+class ReminderLogRollup(db.Model):
+    """Per schedule, month and status counts of reminder logs that were moved
+    to the archive, so history totals survive retention."""
+    __tablename__ = "reminder_log_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("schedule_id", "month", "status", name="uq_reminder_log_rollups_key"),
+        db.Index("ix_reminder_log_rollups_month", "month"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, nullable=False)           # no FK: rollups outlive deleted schedules
+    month = db.Column(db.Date, nullable=False)                     # first day of the month of sent_at
+    status = db.Column(db.String(20), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class JobRun(db.Model):
+    """Ledger of reminder engine runs: window, checkpoint, counts and
+    timings. A run that died is resumed from its checkpoint (see runs.py)."""
+    __tablename__ = "job_runs"
+    __table_args__ = (
+        db.Index("ix_job_runs_job_started", "job", "started_at", "id"),
+        db.Index("ix_job_runs_started", "started_at", "id"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(64), nullable=False)                 # e.g. scan_and_send_reminders, catch_up
+    window = db.Column(db.Text, nullable=False)                    # canonical JSON of the run's parameters and zone dates
+    window_start = db.Column(db.Date, nullable=False)              # earliest send date covered
+    window_end = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="RUNNING")  # RUNNING / DONE / FAILED / ABANDONED
+    owner = db.Column(db.String(100), nullable=False)              # host:pid running it
+    cursor_zone = db.Column(db.String(64), nullable=True)          # zone being processed; earlier zones are done
+    cursor_id = db.Column(db.Integer, nullable=True)               # last planned_reminders id committed in cursor_zone
+    candidates = db.Column(db.Integer, nullable=False, default=0)
+    queued = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+    resumed_from = db.Column(db.Integer, nullable=True)            # run whose checkpoint this one continued
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+def insert_or_ignore(model, *index_elements, index_where=None):
+    """INSERT ... ON CONFLICT DO NOTHING for SQLite and Postgres."""
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model).on_conflict_do_nothing(
+        index_elements=list(index_elements), index_where=index_where
+    )
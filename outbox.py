@@ -0,0 +1,228 @@
+"""Durable outbox between the reminder planner and the senders.
+
+The scheduler and the HTTP routes only enqueue rendered messages here. A
+worker (`python -m worker`, or the embedded drain job) claims batches with
+a lease, sends them through the dispatcher and writes the outcome back to
+the outbox row, the ReminderLog rows it carries and the send plan.
+"""
+import logging
+import socket
+import os
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, insert, or_, and_, tuple_, update
+import metrics
+from config import Config
+from dispatcher import OutgoingEmail, dispatch
+from models import db, OutboxMessage, ReminderLog
+from planner import mark_planned
+from utils import parse_csv_emails, retry_backoff
+
+
+def message_row(email: OutgoingEmail) -> dict:
+    return dict(
+        to_emails=", ".join(email.to_emails),
+        cc_emails=", ".join(email.cc_emails),
+        bcc_emails=", ".join(email.bcc_emails),
+        subject=email.subject,
+        html_body=email.html,
+        text_body=email.text,
+        status="QUEUED",
+        attempts=0,
+    )
+
+
+def enqueue(emails, log_ids):
+    """Queue one message per email with a single executemany INSERT and
+    point the matching ReminderLog rows at it. `log_ids[i]` is the list of
+    log ids carried by `emails[i]`. Returns the message ids. The caller
+    commits, so claim and enqueue land in the same transaction."""
+    if not emails:
+        return []
+    message_ids = db.session.execute(
+        insert(OutboxMessage).returning(OutboxMessage.id, sort_by_parameter_order=True),
+        [message_row(e) for e in emails],
+    ).scalars().all()
+    db.session.execute(update(ReminderLog), [
+        dict(id=log_id, outbox_id=message_id)
+        for message_id, ids in zip(message_ids, log_ids)
+        for log_id in ids
+    ])
+    return message_ids
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claimable(now: datetime):
+    return or_(
+        OutboxMessage.status == "QUEUED",
+        and_(OutboxMessage.status == "SENDING", OutboxMessage.lease_expires_at < now),
+    )
+
+
+def claim_batch(worker_id: str, limit: int):
+    """Lease up to `limit` messages for this worker. The UPDATE re-checks
+    claimability, so two workers racing for the same ids cannot both win."""
+    now = datetime.utcnow()
+    token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+    candidates = (
+        db.session.query(OutboxMessage.id)
+        .filter(_claimable(now))
+        .order_by(OutboxMessage.id)
+        .limit(limit)
+    )
+    if db.engine.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    ids = [row.id for row in candidates]
+    if not ids:
+        db.session.commit()
+        return []
+    db.session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(ids), _claimable(now))
+        .values(
+            status="SENDING",
+            lease_owner=token,
+            lease_expires_at=now + timedelta(seconds=Config.OUTBOX_LEASE_SECONDS),
+            attempts=OutboxMessage.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return (
+        OutboxMessage.query.filter_by(lease_owner=token, status="SENDING")
+        .order_by(OutboxMessage.id)
+        .all()
+    )
+
+
+def _outgoing(msg: OutboxMessage) -> OutgoingEmail:
+    return OutgoingEmail(
+        ref=(msg.id, msg.lease_owner),  # the claim the result is written back under
+        to_emails=parse_csv_emails(msg.to_emails or ""),
+        cc_emails=parse_csv_emails(msg.cc_emails or ""),
+        bcc_emails=parse_csv_emails(msg.bcc_emails or ""),
+        subject=msg.subject,
+        html=msg.html_body,
+        text=msg.text_body,
+    )
+
+
+def _still_claimed(claims):
+    """Of the (message id, lease token) claims, the message ids still SENDING
+    under that token. Their lease expiry is cleared in the same statement, so
+    no other worker can re-claim them before this transaction commits."""
+    return set(db.session.execute(
+        update(OutboxMessage)
+        .where(tuple_(OutboxMessage.id, OutboxMessage.lease_owner).in_(claims), OutboxMessage.status == "SENDING")
+        .values(lease_expires_at=None)
+        .returning(OutboxMessage.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+
+def complete(results):
+    """Write dispatcher results back to the outbox, the logs and the plan.
+    A result whose lease expired and was re-claimed by another worker is
+    dropped: that worker owns the message and its outcome now."""
+    if not results:
+        return
+    owned = _still_claimed([r.ref for r in results])
+    lost = [r.ref[0] for r in results if r.ref[0] not in owned]
+    if lost:
+        logging.warning("Outbox lease lost before completion, dropping the result of message(s) %s", lost)
+    results = [r for r in results if r.ref[0] in owned]
+    if not results:
+        db.session.commit()
+        return
+    now = datetime.utcnow()
+    outbox = OutboxMessage.__table__
+    db.session.execute(
+        update(outbox)
+        .where(outbox.c.id == bindparam("m_id"), outbox.c.lease_owner == bindparam("m_owner"),
+               outbox.c.status == "SENDING")
+        .values(status=bindparam("m_status"), error_message=bindparam("m_error"), sent_at=now,
+                lease_owner=None, lease_expires_at=None),
+        [dict(m_id=r.ref[0], m_owner=r.ref[1], m_status="DONE" if r.ok else "FAILED", m_error=r.error)
+         for r in results],
+    )
+    logs = ReminderLog.__table__
+    db.session.execute(
+        update(logs)
+        .where(logs.c.outbox_id == bindparam("m_id"), logs.c.status == "SENDING")
+        .values(status=bindparam("m_status"), error_message=bindparam("m_error"), sent_at=now),
+        [dict(m_id=r.ref[0], m_status="SENT" if r.ok else "FAILED", m_error=r.error) for r in results],
+    )
+    _schedule_retries([r.ref[0] for r in results if not r.ok], now)
+    outcome = {r.ref[0]: "SENT" if r.ok else "FAILED" for r in results}
+    carried = db.session.query(
+        ReminderLog.outbox_id,
+        ReminderLog.schedule_id,
+        ReminderLog.planned_due_date,
+        ReminderLog.reminder_offset_days,
+    ).filter(ReminderLog.outbox_id.in_(list(outcome)))
+    mark_planned({(sid, due, off): outcome[mid] for mid, sid, due, off in carried})
+    db.session.commit()
+
+
+def _schedule_retries(message_ids, now: datetime):
+    """Give the logs of failed messages their next attempt time (backoff with
+    jitter), or retire them as DEAD once MAX_RETRY_ATTEMPTS retries were used."""
+    if not message_ids:
+        return
+    failed = db.session.query(ReminderLog.id, ReminderLog.retry_count).filter(
+        ReminderLog.outbox_id.in_(message_ids), ReminderLog.status == "FAILED"
+    )
+    updates = []
+    for log_id, retry_count in failed:
+        if retry_count >= Config.MAX_RETRY_ATTEMPTS:
+            updates.append(dict(id=log_id, status="DEAD", next_attempt_at=None))
+        else:
+            delay = retry_backoff(retry_count, Config.RETRY_BACKOFF_BASE_MINUTES, Config.RETRY_JITTER)
+            updates.append(dict(id=log_id, status="FAILED", next_attempt_at=now + delay))
+    if updates:
+        db.session.execute(update(ReminderLog), updates)
+
+
+def process_batch(worker_id: str, limit: int | None = None) -> int:
+    """Claim, send and complete one batch; returns the number of messages."""
+    messages = claim_batch(worker_id, limit or Config.OUTBOX_BATCH_SIZE)
+    if not messages:
+        return 0
+    emails = [_outgoing(m) for m in messages]
+    with metrics.PHASE_SECONDS.time(phase="dispatch"):
+        results = dispatch(emails)
+    complete(results)
+    return len(messages)
+
+
+def drain(worker_id: str | None = None, max_batches: int | None = None) -> int:
+    """Process batches until the outbox is empty (or `max_batches` ran)."""
+    worker_id = worker_id or default_worker_id()
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        n = process_batch(worker_id)
+        if not n:
+            break
+        total += n
+        batches += 1
+    return total
+
+
+@metrics.register_collector
+def _queue_depths():
+    outbox = db.session.query(OutboxMessage.status, db.func.count()).filter(
+        OutboxMessage.status.in_(("QUEUED", "SENDING"))
+    ).group_by(OutboxMessage.status)
+    retry_depth = db.session.query(db.func.count()).filter(
+        ReminderLog.status == "FAILED", ReminderLog.next_attempt_at.isnot(None)
+    ).scalar()
+    return (
+        metrics.gauge_lines("reminder_outbox_depth", "Outbox messages waiting or in flight.",
+                            [(status, n) for status, n in outbox], label="status")
+        + metrics.gauge_lines("reminder_retry_queue_depth", "FAILED reminders waiting for a retry.",
+                              [(None, retry_depth)])
+    )
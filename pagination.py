@@ -0,0 +1,117 @@
+"""Keyset (cursor) pagination.
+
+Pages are addressed by the (sort value, id) of their first or last row
+instead of an OFFSET, so every page is a bounded range scan on a composite
+index and costs the same whether it is the first page or the thousandth.
+Cursors are opaque, URL-safe tokens; a tampered or stale token simply
+yields the first page.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import NamedTuple
+from sqlalchemy import tuple_
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: str | None   # token for the following page (`after=`)
+    prev_cursor: str | None   # token for the preceding page (`before=`)
+
+
+def _dump(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _load(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort_value, row_id) -> str:
+    raw = json.dumps([_dump(sort_value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str | None, sort_col):
+    """Return (sort value, id) or None if the token is missing or invalid."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+        return _load(sort_value, sort_col), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_page(query, sort_col, id_col, per_page: int, after=None, before=None, descending=False):
+    """Fetch one page of `query` ordered by (sort_col, id_col).
+
+    `after`/`before` are cursor tokens from a previous Page. Rows are read
+    with LIMIT per_page + 1 to learn whether another page exists.
+    """
+    sort_key = sort_col.key
+    id_key = id_col.key
+
+    def key_of(item):
+        return getattr(item, sort_key), getattr(item, id_key)
+
+    key = tuple_(sort_col, id_col)
+    before_pos = decode_cursor(before, sort_col)
+    after_pos = None if before_pos else decode_cursor(after, sort_col)
+
+    # Walking backwards (towards the start of the list) flips the order and
+    # the comparison, then the rows are reversed back into display order.
+    backwards = before_pos is not None
+    reverse_order = descending != backwards
+    if before_pos:
+        query = query.filter(key > tuple_(*before_pos) if descending else key < tuple_(*before_pos))
+    elif after_pos:
+        query = query.filter(key < tuple_(*after_pos) if descending else key > tuple_(*after_pos))
+    if reverse_order:
+        query = query.order_by(sort_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(sort_col.asc(), id_col.asc())
+
+    rows = query.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return Page([], None, None)
+
+    first, last = encode_cursor(*key_of(rows[0])), encode_cursor(*key_of(rows[-1]))
+    if backwards:
+        return Page(rows, last, first if more else None)
+    return Page(rows, last if more else None, first if after_pos else None)
+
+
+def keyset_chunks(query, id_col, size: int, key: str | None = None, after=None):
+    """Yield the rows of `query` in `id_col` order, `size` rows at a time,
+    starting after `after` if given.
+
+    Each chunk is its own LIMIT query starting after the previous chunk's
+    last id (read from the row attribute `key`, default `id_col.key`), so no
+    cursor stays open between chunks and the caller may write and commit in
+    between. Only one chunk is held in memory.
+    """
+    key = key or id_col.key
+    last = after
+    while True:
+        page = query if last is None else query.filter(id_col > last)
+        rows = page.order_by(id_col).limit(size).all()
+        if rows:
+            yield rows
+        if len(rows) < size:
+            return
+        last = getattr(rows[-1], key)
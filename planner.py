@@ -0,0 +1,265 @@
+"""Materialized send plan.
+
+`planned_reminders` holds one row per (schedule, due, offset) whose send date
+falls in a rolling window from MISSED_SCAN_DAYS back to PLAN_HORIZON_DAYS
+ahead. The routes re-plan a schedule when it is created, edited or deleted,
+the daily job only extends the window by the days it has not planned yet,
+and "what is sent on day X" becomes an indexed lookup on send_date.
+"""
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import pytz
+from sqlalchemy import bindparam, delete, update
+from config import Config
+from models import db, Schedule, PlannedReminder, PlanHorizon, insert_or_ignore
+from pagination import keyset_chunks
+from utils import next_occurrence, send_dates_between
+
+
+@lru_cache(maxsize=None)
+def get_tz(name: str | None = None):
+    """pytz zone by name (APP_TZ by default), built once per process."""
+    return pytz.timezone(name or Config.APP_TZ)
+
+
+def schedule_timezones():
+    """APP_TZ followed by the other zones schedules may be assigned to."""
+    return list(dict.fromkeys([Config.APP_TZ, *Config.SCHEDULE_TIMEZONES]))
+
+
+def schedule_tz(schedule) -> str:
+    """The zone a schedule is run in: its own if it is one of
+    schedule_timezones(), else APP_TZ (e.g. a zone since removed from
+    SCHEDULE_TIMEZONES), the same fold the engine applies."""
+    tz = getattr(schedule, "timezone", None)
+    return tz if tz in schedule_timezones() else Config.APP_TZ
+
+
+def zone_filter(tz: str):
+    """SQL criterion for the schedules run in zone `tz` (see schedule_tz)."""
+    if tz != Config.APP_TZ:
+        return Schedule.timezone == tz
+    others = [z for z in schedule_timezones() if z != Config.APP_TZ]
+    return Schedule.timezone.is_(None) | Schedule.timezone.notin_(others)
+
+
+def unlisted_zones() -> dict:
+    """{zone: active schedules} for zones not in schedule_timezones(); those
+    schedules are run in APP_TZ."""
+    rows = (
+        db.session.query(Schedule.timezone, db.func.count())
+        .filter(Schedule.active.is_(True), Schedule.timezone.notin_(schedule_timezones()))
+        .group_by(Schedule.timezone)
+    )
+    return dict(rows.all())
+
+
+def local_today(tz_name: str | None = None) -> date:
+    return datetime.now(get_tz(tz_name)).date()
+
+
+def local_time(value: datetime | None, tz_name: str | None = None) -> datetime | None:
+    """A stored (naive UTC) timestamp as an aware datetime in `tz_name`."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = pytz.utc.localize(value)
+    return value.astimezone(get_tz(tz_name))
+
+
+def schedule_offsets(schedule):
+    return schedule.offsets or Config.DEFAULT_REMINDER_OFFSETS
+
+
+def plan_rows(schedule, start: date, end: date):
+    """Plan rows for one schedule whose send date lies within [start, end]."""
+    return [
+        dict(
+            schedule_id=schedule.id,
+            due_date=due,
+            offset_days=off,
+            send_date=send_date,
+            status="PENDING",
+        )
+        for due, off, send_date in send_dates_between(
+            schedule.anchor_due_date, schedule.interval_months, schedule_offsets(schedule), start, end)
+    ]
+
+
+def _insert_rows(rows):
+    stmt = insert_or_ignore(PlannedReminder, "schedule_id", "due_date", "offset_days")
+    for i in range(0, len(rows), Config.LOG_WRITE_CHUNK_SIZE):
+        db.session.execute(stmt, rows[i:i + Config.LOG_WRITE_CHUNK_SIZE])
+
+
+def planned_through() -> date | None:
+    horizon = db.session.get(PlanHorizon, 1)
+    return horizon.planned_through if horizon else None
+
+
+def plan_floor() -> date | None:
+    """Earliest send date that may be planned. With LOG_RETENTION_DAYS on,
+    logs and acted-on plan rows before the retention cutoff are archived and
+    pruned, so planning such a key again would send it again."""
+    if Config.LOG_RETENTION_DAYS <= 0:
+        return None
+    return (datetime.utcnow() - timedelta(days=Config.LOG_RETENTION_DAYS)).date()
+
+
+def fill_plan(start: date, end: date):
+    """Plan every active schedule for send dates in [start, end] (never
+    before plan_floor()). Rows that already exist (pending or already acted
+    on) are left untouched."""
+    floor = plan_floor()
+    if floor is not None and start < floor:
+        start = floor
+    schedules = db.session.query(
+        Schedule.id,
+        Schedule.anchor_due_date,
+        Schedule.interval_months,
+        Schedule.offsets,
+    ).filter(Schedule.active.is_(True)).execution_options(yield_per=Config.LOG_WRITE_CHUNK_SIZE)
+    rows = []
+    for sch in schedules:
+        rows.extend(plan_rows(sch, start, end))
+        if len(rows) >= Config.LOG_WRITE_CHUNK_SIZE:
+            _insert_rows(rows)
+            rows = []
+    _insert_rows(rows)
+
+
+def extend_plan(today: date | None = None):
+    """Make sure the plan reaches today + PLAN_HORIZON_DAYS, computing only
+    the days past the previous horizon. Called by the daily job."""
+    today = today or local_today()
+    target = today + timedelta(days=Config.PLAN_HORIZON_DAYS)
+    earliest = today - timedelta(days=Config.MISSED_SCAN_DAYS)
+    through = planned_through()
+    if through is not None and through >= target:
+        return
+    start = earliest if through is None else max(through + timedelta(days=1), earliest)
+    fill_plan(start, target)
+    horizon = db.session.get(PlanHorizon, 1)
+    if horizon is None:
+        db.session.add(PlanHorizon(id=1, planned_through=target))
+    else:
+        horizon.planned_through = target
+    db.session.commit()
+
+
+def _plan_window(today: date):
+    end = planned_through() or today + timedelta(days=Config.PLAN_HORIZON_DAYS)
+    start = today - timedelta(days=Config.MISSED_SCAN_DAYS)
+    floor = plan_floor()
+    return (max(start, floor) if floor else start), end
+
+
+def plan_schedules(schedules, today: date | None = None):
+    """Plan freshly inserted schedules (column rows or instances) over the
+    current window. Does not commit."""
+    start, end = _plan_window(today or local_today())
+    rows = []
+    for sch in schedules:
+        rows.extend(plan_rows(sch, start, end))
+    _insert_rows(rows)
+
+
+def refresh_schedule_plan(schedule: Schedule, today: date | None = None):
+    """Re-plan one schedule after it was created or edited: its pending rows
+    are rebuilt, rows that were already sent or failed stay as history."""
+    today = today or local_today(schedule_tz(schedule))
+    schedule.next_due_date = next_occurrence(schedule.anchor_due_date, schedule.interval_months, today)
+    db.session.execute(
+        delete(PlannedReminder)
+        .where(PlannedReminder.schedule_id == schedule.id, PlannedReminder.status == "PENDING")
+        .execution_options(synchronize_session=False)
+    )
+    if schedule.active:
+        plan_schedules([schedule], today)
+    db.session.commit()
+
+
+def replan_schedules(schedules, today: date | None = None):
+    """Batch form of refresh_schedule_plan for rewritten schedules (column
+    rows with next_due_date already set): their pending rows are rebuilt
+    for the active ones and dropped for the rest. Does not commit."""
+    ids = [sch.id for sch in schedules]
+    for i in range(0, len(ids), Config.LOG_WRITE_CHUNK_SIZE):
+        db.session.execute(
+            delete(PlannedReminder)
+            .where(PlannedReminder.schedule_id.in_(ids[i:i + Config.LOG_WRITE_CHUNK_SIZE]),
+                   PlannedReminder.status == "PENDING")
+            .execution_options(synchronize_session=False)
+        )
+    plan_schedules([sch for sch in schedules if sch.active], today)
+
+
+def drop_schedule_plan(schedule_id: int):
+    """Remove every planned row of a schedule that is about to be deleted."""
+    db.session.execute(
+        delete(PlannedReminder)
+        .where(PlannedReminder.schedule_id == schedule_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_planned(statuses):
+    """Record the outcome for planned keys: {(schedule_id, due, offset): status}."""
+    if not statuses:
+        return
+    table = PlannedReminder.__table__
+    stmt = (
+        update(table)
+        .where(
+            table.c.schedule_id == bindparam("k_schedule_id"),
+            table.c.due_date == bindparam("k_due_date"),
+            table.c.offset_days == bindparam("k_offset_days"),
+        )
+        .values(status=bindparam("k_status"))
+    )
+    db.session.execute(stmt, [
+        dict(k_schedule_id=sid, k_due_date=due, k_offset_days=off, k_status=status)
+        for (sid, due, off), status in statuses.items()
+    ])
+
+
+def advance_next_dues(today: date | None = None) -> int:
+    """Recompute Schedule.next_due_date where it has fallen behind the
+    schedule's local today or was never filled in. Only those rows are
+    touched (an indexed range), so calling this on every dashboard load is
+    cheap. Passing `today` uses that date for every zone."""
+    todays = {tz: today or local_today(tz) for tz in schedule_timezones()}
+    # The range is widened to cover every zone; each row is then evaluated
+    # against its own zone's date.
+    stale = (
+        db.session.query(Schedule.id, Schedule.anchor_due_date, Schedule.interval_months, Schedule.timezone,
+                         Schedule.next_due_date)
+        .filter(
+            Schedule.active.is_(True),
+            (Schedule.next_due_date < max(todays.values()))
+            | (Schedule.next_due_date.is_(None)
+               & ((Schedule.interval_months > 0) | (Schedule.anchor_due_date >= min(todays.values())))),
+        )
+    )
+    # A derived column moving on is not an edit: updated_at is kept as is.
+    table = Schedule.__table__
+    advance = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(next_due_date=bindparam("b_next_due"), updated_at=table.c.updated_at)
+    )
+    updated = 0
+    for chunk in keyset_chunks(stale, Schedule.id, Config.LOG_WRITE_CHUNK_SIZE):
+        rows = []
+        for s in chunk:
+            tz = schedule_tz(s)
+            if tz not in todays:
+                todays[tz] = today or local_today(tz)
+            next_due = next_occurrence(s.anchor_due_date, s.interval_months, todays[tz])
+            if next_due != s.next_due_date:
+                rows.append(dict(b_id=s.id, b_next_due=next_due))
+        if rows:
+            db.session.execute(advance, rows)
+            db.session.commit()
+        updated += len(rows)
+    return updated
@@ -0,0 +1,192 @@
+"""Normalized recipients and offsets of schedules.
+
+`recipient_emails`, `cc_emails` and `reminder_offsets_days` stay the
+editable text (forms, import, export); `schedule_recipients` and
+`Schedule.offsets` are their parsed form, which is what the engine reads.
+`sync_schedule` keeps the two in step on every write path, and `backfill`
+fills them in for schedules written before they existed.
+
+    python -m recipients find pic@bank.co.id
+    python -m recipients replace old@bank.co.id new@bank.co.id
+"""
+import argparse
+import sys
+from typing import NamedTuple
+from sqlalchemy import bindparam, delete, exists, insert, select, update
+from config import Config
+from models import db, Schedule, ScheduleRecipient
+from utils import EMAIL_RE, normalize_recipients, parse_csv_emails, parse_offsets
+
+
+class Recipients(NamedTuple):
+    to: list
+    cc: list
+
+
+def has_valid_recipient(to_text: str) -> bool:
+    """Whether `to_text` holds at least one valid address; a schedule
+    without one can never be sent."""
+    return any(valid for _, _, valid in normalize_recipients(to_text))
+
+
+def recipient_rows(schedule_id: int, to_text: str, cc_text: str | None = None):
+    return [
+        dict(schedule_id=schedule_id, email=email, role=role, valid=valid)
+        for email, role, valid in normalize_recipients(to_text, cc_text)
+    ]
+
+
+def add_recipients(schedules):
+    """Insert the recipient rows of freshly inserted schedules (column rows
+    or instances with id, recipient_emails and cc_emails). Does not commit."""
+    rows = [r for sch in schedules for r in recipient_rows(sch.id, sch.recipient_emails, sch.cc_emails)]
+    for i in range(0, len(rows), Config.LOG_WRITE_CHUNK_SIZE):
+        db.session.execute(insert(ScheduleRecipient), rows[i:i + Config.LOG_WRITE_CHUNK_SIZE])
+
+
+def drop_recipients(schedule_id: int):
+    db.session.execute(
+        delete(ScheduleRecipient).where(ScheduleRecipient.schedule_id == schedule_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def resync_recipients(schedules):
+    """Rebuild the recipient rows of rewritten schedules (column rows or
+    instances). Does not commit."""
+    ids = [sch.id for sch in schedules]
+    for i in range(0, len(ids), Config.LOG_WRITE_CHUNK_SIZE):
+        db.session.execute(
+            delete(ScheduleRecipient)
+            .where(ScheduleRecipient.schedule_id.in_(ids[i:i + Config.LOG_WRITE_CHUNK_SIZE]))
+            .execution_options(synchronize_session=False)
+        )
+    add_recipients(schedules)
+
+
+def sync_schedule(schedule: Schedule):
+    """Re-derive `schedule.offsets` and its recipient rows from the text
+    columns. Flushes a new schedule to get its id; does not commit."""
+    schedule.offsets = parse_offsets(schedule.reminder_offsets_days) or None
+    if schedule.id is None:
+        db.session.flush()
+    drop_recipients(schedule.id)
+    add_recipients([schedule])
+
+
+def recipients_for(schedule_ids):
+    """{schedule_id: Recipients(to, cc)} of the valid addresses of
+    `schedule_ids`, one indexed query per LOG_WRITE_CHUNK_SIZE ids."""
+    ids = list(schedule_ids)
+    out = {sid: Recipients([], []) for sid in ids}
+    for i in range(0, len(ids), Config.LOG_WRITE_CHUNK_SIZE):
+        rows = db.session.execute(
+            select(ScheduleRecipient.schedule_id, ScheduleRecipient.email, ScheduleRecipient.role)
+            .where(
+                ScheduleRecipient.schedule_id.in_(ids[i:i + Config.LOG_WRITE_CHUNK_SIZE]),
+                ScheduleRecipient.valid.is_(True),
+            )
+            .order_by(ScheduleRecipient.id)
+        )
+        for sid, email, role in rows:
+            getattr(out[sid], role).append(email)
+    return out
+
+
+def schedules_for(email: str, role: str | None = None):
+    """Schedules that send to `email` (as `role`, if given), by id."""
+    query = Schedule.query.join(ScheduleRecipient, ScheduleRecipient.schedule_id == Schedule.id).filter(
+        ScheduleRecipient.email == email.strip().lower())
+    if role:
+        query = query.filter(ScheduleRecipient.role == role)
+    return query.order_by(Schedule.id).all()
+
+
+def _replace(text: str | None, old: str, new: str):
+    if not text:
+        return text
+    return ", ".join(dict.fromkeys(new if e.lower() == old else e for e in parse_csv_emails(text)))
+
+
+def replace_address(old: str, new: str) -> int:
+    """Replace `old` by `new` in every schedule that sends to it, in one
+    transaction. Returns the number of schedules changed."""
+    old = old.strip().lower()
+    new = new.strip()
+    if not EMAIL_RE.match(new):
+        raise ValueError(f"invalid address {new!r}")
+    schedules = schedules_for(old)
+    for s in schedules:
+        s.recipient_emails = _replace(s.recipient_emails, old, new)
+        s.cc_emails = _replace(s.cc_emails, old, new)
+        sync_schedule(s)
+    db.session.commit()
+    return len(schedules)
+
+
+def backfill(conn):
+    """Fill in `offsets` and recipient rows for schedules that have text but
+    no parsed form yet, LOG_WRITE_CHUNK_SIZE schedules at a time in id order.
+    `conn` is a Connection or Session; does not commit."""
+    schedules = Schedule.__table__
+    last = 0
+    while True:
+        chunk = conn.execute(
+            select(
+                schedules.c.id, schedules.c.reminder_offsets_days, schedules.c.offsets.is_(None),
+                schedules.c.recipient_emails, schedules.c.cc_emails,
+                ~exists().where(ScheduleRecipient.schedule_id == schedules.c.id),
+            )
+            .where(schedules.c.id > last)
+            .order_by(schedules.c.id)
+            .limit(Config.LOG_WRITE_CHUNK_SIZE)
+        ).all()
+        if not chunk:
+            return
+        last = chunk[-1][0]
+        offsets = [
+            dict(b_id=sid, b_offsets=parse_offsets(text))
+            for sid, text, no_offsets, _, _, _ in chunk if no_offsets and parse_offsets(text)
+        ]
+        if offsets:
+            conn.execute(
+                update(schedules).where(schedules.c.id == bindparam("b_id")).values(offsets=bindparam("b_offsets")),
+                offsets,
+            )
+        rows = [
+            r for sid, _, _, to_text, cc_text, no_recipients in chunk if no_recipients
+            for r in recipient_rows(sid, to_text, cc_text)
+        ]
+        if rows:
+            conn.execute(insert(ScheduleRecipient), rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Look up and change schedule recipients by address.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    find = sub.add_parser("find", help="list the schedules that send to an address")
+    find.add_argument("email")
+    find.add_argument("--role", choices=("to", "cc"))
+    rep = sub.add_parser("replace", help="replace an address in every schedule that sends to it")
+    rep.add_argument("old")
+    rep.add_argument("new")
+    args = ap.parse_args()
+
+    from app import create_app
+
+    with create_app().app_context():
+        if args.command == "find":
+            for s in schedules_for(args.email, args.role):
+                print(f"{s.id}\t{s.entity_name}\t{s.report_name}")
+            return 0
+        try:
+            changed = replace_address(args.old, args.new)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+    print(f"{changed} schedule(s) updated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""Retention for reminder_logs: archive old rows, keep monthly rollups.
+
+Logs older than LOG_RETENTION_DAYS are appended to gzip JSONL files, one per
+month of sent_at (`reminder_logs-YYYY-MM.jsonl.gz` under LOG_ARCHIVE_DIR),
+counted into `reminder_log_rollups` and deleted, one chunk per transaction.
+Every chunk is a new gzip member appended to its file, so files are never
+rewritten and stay readable with any gzip tool.
+
+Rows that are still needed stay in the table: SENDING and FAILED rows (in
+flight or awaiting a retry), and rows whose due date is inside the window.
+An archived key is not sent again because its planned_reminders row is no
+longer PENDING. The same job then prunes those acted-on plan rows once
+their send date is past the cutoff; the planner never plans that far back
+(see `planner.plan_floor`). Rollups are counted from the rows each DELETE
+returns, so two archivers running at once (the leader's job and the CLI)
+do not double-count. A run interrupted between writing a chunk and
+committing its delete appends that chunk again next time; the reader skips
+repeated ids.
+
+    python -m retention archive [--days N]
+    python -m retention search 2025-01 [--status FAILED] [--schedule-id 7]
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import sys
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+from sqlalchemy import bindparam, delete, func, update
+from bulk import LOG_FIELDS, jsonable, log_export_query
+from config import Config
+from models import db, PlannedReminder, ReminderLog, ReminderLogRollup, insert_or_ignore
+from pagination import keyset_chunks
+from planner import local_today
+
+ARCHIVE_CHUNK_SIZE = 1000
+# Rows the retention pass never archives.
+KEEP_STATUSES = ("SENDING", "FAILED")
+
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+_FILE_RE = re.compile(r"^reminder_logs-(\d{4}-\d{2})\.jsonl\.gz$")
+
+
+class ArchiveResult(NamedTuple):
+    archived: int
+    months: list  # months whose archive file was appended to
+    plans_pruned: int = 0
+
+
+def archive_path(month: str) -> str:
+    if not _MONTH_RE.match(month):
+        raise ValueError(f"month must be YYYY-MM, got {month!r}")
+    return os.path.join(Config.LOG_ARCHIVE_DIR, f"reminder_logs-{month}.jsonl.gz")
+
+
+def archived_months():
+    """Months with an archive file, newest first."""
+    if not os.path.isdir(Config.LOG_ARCHIVE_DIR):
+        return []
+    months = [m.group(1) for m in map(_FILE_RE.match, os.listdir(Config.LOG_ARCHIVE_DIR)) if m]
+    return sorted(months, reverse=True)
+
+
+def _add_rollups(rows):
+    """Add the (schedule_id, sent_at, status) rows a chunk deleted to the
+    rollup counts: missing keys are inserted at 0 (insert-or-ignore), then
+    one executemany increments them. Counting what the DELETE returned means
+    a concurrent archiver, which deletes nothing twice, counts nothing twice."""
+    counts = Counter((sid, sent_at.date().replace(day=1), status) for sid, sent_at, status in rows)
+    if not counts:
+        return
+    db.session.execute(
+        insert_or_ignore(ReminderLogRollup, "schedule_id", "month", "status"),
+        [dict(schedule_id=sid, month=month, status=status, count=0) for sid, month, status in counts],
+    )
+    table = ReminderLogRollup.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.schedule_id == bindparam("k_sid"), table.c.month == bindparam("k_month"),
+               table.c.status == bindparam("k_status"))
+        .values(count=table.c.count + bindparam("k_n")),
+        [dict(k_sid=sid, k_month=month, k_status=status, k_n=n) for (sid, month, status), n in counts.items()],
+    )
+
+
+def _prune_plan(cutoff: date) -> int:
+    """Delete planned_reminders rows that were acted on (not PENDING) and
+    whose send date is before `cutoff`, a chunk per transaction."""
+    pruned = 0
+    while True:
+        ids = [
+            plan_id for (plan_id,) in db.session.query(PlannedReminder.id)
+            .filter(PlannedReminder.send_date < cutoff, PlannedReminder.status != "PENDING")
+            .limit(ARCHIVE_CHUNK_SIZE)
+        ]
+        if not ids:
+            return pruned
+        db.session.execute(
+            delete(PlannedReminder).where(PlannedReminder.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        pruned += len(ids)
+
+
+def archive_logs(days: int | None = None, now: datetime | None = None) -> ArchiveResult:
+    """Move logs older than `days` (default LOG_RETENTION_DAYS; 0 disables)
+    to the monthly archive files, chunk by chunk."""
+    days = Config.LOG_RETENTION_DAYS if days is None else days
+    if days <= 0:
+        return ArchiveResult(0, [])
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    query = log_export_query(ReminderLog.query.filter(
+        ReminderLog.sent_at < cutoff,
+        ReminderLog.planned_due_date < cutoff.date(),
+        ReminderLog.status.notin_(KEEP_STATUSES),
+    ))
+    os.makedirs(Config.LOG_ARCHIVE_DIR, exist_ok=True)
+    archived = 0
+    months = set()
+    for chunk in keyset_chunks(query, ReminderLog.id, ARCHIVE_CHUNK_SIZE):
+        by_month = {}
+        for row in chunk:
+            by_month.setdefault(row.sent_at.strftime("%Y-%m"), []).append(row)
+        for month, rows in by_month.items():
+            with gzip.open(archive_path(month), "at", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(dict(zip(LOG_FIELDS, map(jsonable, row))), ensure_ascii=False) + "\n")
+            months.add(month)
+        deleted = db.session.execute(
+            delete(ReminderLog).where(ReminderLog.id.in_([row.id for row in chunk]))
+            .returning(ReminderLog.schedule_id, ReminderLog.sent_at, ReminderLog.status)
+            .execution_options(synchronize_session=False)
+        ).all()
+        _add_rollups(deleted)
+        db.session.commit()
+        db.session.expunge_all()
+        archived += len(deleted)
+    return ArchiveResult(archived, sorted(months), _prune_plan(cutoff.date()))
+
+
+def iter_archive(month: str, schedule_id=None, status=None, date_from=None, date_to=None, after_line: int = 0):
+    """Stream (line number, row dict) of the archived logs of `month` that
+    match the /logs filters, starting after line `after_line`. The file is
+    read line by line; nothing but the ids seen so far is kept in memory."""
+    path = archive_path(month)
+    if not os.path.exists(path):
+        return
+    seen = set()
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            row = json.loads(line)
+            if row["id"] in seen:
+                continue
+            seen.add(row["id"])
+            if line_no <= after_line:
+                continue
+            if schedule_id and row["schedule_id"] != schedule_id:
+                continue
+            if status and row["status"] != status:
+                continue
+            day = row["sent_at"][:10]
+            if date_from and day < date_from.isoformat():
+                continue
+            if date_to and day > date_to.isoformat():
+                continue
+            yield line_no, row
+
+
+def archive_page(month: str, per_page: int, after_line: int = 0, **filters):
+    """One page of matching archived rows and the line to continue after
+    (None on the last page)."""
+    rows = []
+    last_line = None
+    for line_no, row in iter_archive(month, after_line=after_line, **filters):
+        if len(rows) == per_page:
+            return rows, last_line
+        rows.append(row)
+        last_line = line_no
+    return rows, None
+
+
+def export_archive(month: str, fmt: str = "csv", **filters):
+    """Matching archived rows of `month` as CSV or JSONL text chunks."""
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(LOG_FIELDS)
+    for n, (_, row) in enumerate(iter_archive(month, **filters), start=1):
+        if writer:
+            writer.writerow(["" if row.get(f) is None else row[f] for f in LOG_FIELDS])
+        else:
+            buf.write(json.dumps(row, ensure_ascii=False) + "\n")
+        if n % ARCHIVE_CHUNK_SIZE == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def monthly_totals(months: int = 12):
+    """Archived log counts of the last `months` months, newest first:
+    [(month, {status: count})]."""
+    today = local_today()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    since = date(index // 12, index % 12 + 1, 1)
+    rows = (
+        db.session.query(ReminderLogRollup.month, ReminderLogRollup.status, func.sum(ReminderLogRollup.count))
+        .filter(ReminderLogRollup.month >= since)
+        .group_by(ReminderLogRollup.month, ReminderLogRollup.status)
+        .order_by(ReminderLogRollup.month.desc())
+        .all()
+    )
+    totals = {}
+    for month, status, count in rows:
+        totals.setdefault(month, {})[status] = int(count)
+    return list(totals.items())
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Archive old reminder logs and search the archive.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    arc = sub.add_parser("archive", help="move logs past the retention age to the archive")
+    arc.add_argument("--days", type=int, help="retention age (default LOG_RETENTION_DAYS)")
+    search = sub.add_parser("search", help="print archived logs of a month as JSONL")
+    search.add_argument("month", help="YYYY-MM")
+    search.add_argument("--schedule-id", type=int)
+    search.add_argument("--status")
+    args = ap.parse_args()
+
+    if args.command == "search":
+        for _, row in iter_archive(args.month, schedule_id=args.schedule_id,
+                                   status=args.status.upper() if args.status else None):
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return 0
+
+    from app import create_app
+
+    with create_app().app_context():
+        result = archive_logs(args.days)
+    print(f"{result.archived} log(s) archived" + (f" into {', '.join(result.months)}" if result.months else "")
+          + f", {result.plans_pruned} old plan row(s) pruned")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Ledger of reminder engine runs (`job_runs`).
+
+Every run_reminders() pass records its window, a checkpoint after each
+committed chunk (the zone being processed and the last planned_reminders id
+done in it), its counts and timings. A run is dead once its process is gone
+(same host, pid no longer alive) or it has not checkpointed for
+JOB_RUN_STALE_MINUTES; it is then marked ABANDONED, and the next run of the
+same job over the same window continues from its checkpoint instead of
+rescanning from the start. Skipping is only a shortcut: claims are still
+deduplicated by the database, so a lagging checkpoint never resends.
+"""
+import json
+import os
+import socket
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+from sqlalchemy import update
+from config import Config
+from models import db, JobRun
+
+_HOST = socket.gethostname()
+_active = set()  # ids of the runs this process is executing
+
+
+class RunHandle(NamedTuple):
+    id: int
+    cursor_zone: str | None
+    cursor_id: int | None
+
+
+def _owner() -> str:
+    return f"{_HOST}:{os.getpid()}"
+
+
+def _is_dead(run: JobRun, now: datetime) -> bool:
+    if run.heartbeat_at < now - timedelta(minutes=Config.JOB_RUN_STALE_MINUTES):
+        return True
+    host, _, pid = run.owner.rpartition(":")
+    if host != _HOST or not pid.isdigit():
+        return False  # another host: only staleness tells
+    if int(pid) == os.getpid():
+        return run.id not in _active  # a previous process that had our pid
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+def abandon_dead_runs(now: datetime | None = None):
+    """Mark RUNNING runs whose process is gone as ABANDONED. Does not commit."""
+    now = now or datetime.utcnow()
+    for run in JobRun.query.filter_by(status="RUNNING"):
+        if _is_dead(run, now):
+            run.status = "ABANDONED"
+            run.finished_at = run.heartbeat_at
+
+
+def start_run(job: str, window: dict, window_start: date, window_end: date) -> RunHandle:
+    """Record a new run. If the last run of `job` over the same `window` died
+    or failed past a checkpoint, the new run starts from that checkpoint."""
+    key = json.dumps(window, sort_keys=True, default=str)
+    abandon_dead_runs()
+    last = JobRun.query.filter_by(job=job, window=key).order_by(JobRun.id.desc()).first()
+    run = JobRun(job=job, window=key, window_start=window_start, window_end=window_end, owner=_owner())
+    if last is not None and last.status in ("ABANDONED", "FAILED") and last.cursor_zone:
+        run.resumed_from = last.id
+        run.cursor_zone, run.cursor_id = last.cursor_zone, last.cursor_id
+    db.session.add(run)
+    db.session.commit()
+    _active.add(run.id)
+    return RunHandle(run.id, run.cursor_zone, run.cursor_id)
+
+
+def checkpoint(run_id: int, zone: str, cursor_id: int, candidates: int = 0, queued: int = 0, skipped: int = 0):
+    """Record progress after a committed chunk and commit it."""
+    db.session.execute(
+        update(JobRun).where(JobRun.id == run_id).values(
+            cursor_zone=zone,
+            cursor_id=cursor_id,
+            candidates=JobRun.candidates + candidates,
+            queued=JobRun.queued + queued,
+            skipped=JobRun.skipped + skipped,
+            heartbeat_at=datetime.utcnow(),
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def finish_run(run_id: int, error: str | None = None):
+    """Close a run as DONE, or FAILED with `error`; its checkpoint stays for
+    the next run to resume from. Rolls back any pending work first."""
+    db.session.rollback()
+    now = datetime.utcnow()
+    db.session.execute(
+        update(JobRun).where(JobRun.id == run_id).values(
+            status="FAILED" if error else "DONE", error=error, finished_at=now, heartbeat_at=now,
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    _active.discard(run_id)
+
+
+def duration_trends(days: int = 30):
+    """Per job, the mean duration in seconds of the DONE runs of each of the
+    last `days` days: {job: [(day, mean seconds, runs)]}, oldest first."""
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = (
+        db.session.query(JobRun.job, JobRun.started_at, JobRun.finished_at)
+        .filter(JobRun.status == "DONE", JobRun.started_at >= since)
+        .order_by(JobRun.started_at)
+    )
+    per_day = {}
+    for job, started, finished in rows:
+        per_day.setdefault(job, {}).setdefault(started.date(), []).append((finished - started).total_seconds())
+    return {
+        job: [(day, sum(values) / len(values), len(values)) for day, values in by_day.items()]
+        for job, by_day in sorted(per_day.items())
+    }
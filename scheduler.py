@@ -1,250 +1,535 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+import atexit
 from datetime import datetime, date, timedelta
-import pytz
+from functools import partial
 from flask import current_app
+from sqlalchemy import exists, insert, update
+from sqlalchemy.orm import aliased
 from config import Config
-from models import db, Schedule, ReminderLog
-from utils import (
-    parse_csv_emails,
-    parse_offsets,
-    next_occurrence,
-    should_send_for_due,
-    generate_upcoming_occurrences,
+from models import (
+    db,
+    Schedule,
+    ReminderLog,
+    PlannedReminder,
+    CLAIMED_STATUSES,
+    CLAIMED_KEY_WHERE,
+    insert_or_ignore,
 )
-from mailer import send_email
+from planner import (
+    advance_next_dues, extend_plan, fill_plan, get_tz, local_today, mark_planned, schedule_timezones,
+    unlisted_zones, zone_filter,
+)
+from mailer import close_smtp_pool
+from dispatcher import OutgoingEmail
+from outbox import drain, enqueue
+from leader import LeaderLease
+import metrics
+from pagination import keyset_chunks
+from recipients import recipients_for
+from email_templates import render_digest, render_reminder
+from retention import archive_logs
+from runs import checkpoint, finish_run, start_run
 
 def build_email_content(schedule: Schedule, due_date: date, offset_days: int):
-    h_text = f"H-{offset_days}" if offset_days > 0 else ("HARI H" if offset_days == 0 else f"H+{abs(offset_days)}")
-    subject = f"[Reminder {h_text}] {schedule.report_name} - {schedule.entity_name} (Due {due_date:%d %b %Y})"
-    html = f"""
-    <p>Yth. PIC <b>{schedule.entity_name}</b>,</p>
-    <p>Ini adalah pengingat <b>{h_text}</b> untuk penyampaian laporan <b>{schedule.report_name}</b>.</p>
-    <ul>
-      <li><b>Entitas</b>: {schedule.entity_name}</li>
-      <li><b>Laporan</b>: {schedule.report_name}</li>
-      <li><b>Jatuh tempo</b>: {due_date:%A, %d %B %Y}</li>
-    </ul>
-    <p>{schedule.description or ''}</p>
-    <p>Mohon tindak lanjut sesuai ketentuan. Terima kasih.</p>
-    <hr>
-    <p><i>Pesan ini dikirim otomatis oleh sistem reminder.</i></p>
-    """
-    text = f"""Reminder {h_text} untuk {schedule.report_name} - {schedule.entity_name}
-Jatuh tempo: {due_date:%A, %d %B %Y}
-{schedule.description or ''}
-Pesan ini dikirim otomatis oleh sistem reminder.
-"""
-    return subject, html, text
-
-def _get_offsets(schedule: Schedule):
-    custom = parse_offsets(schedule.reminder_offsets_days) if schedule.reminder_offsets_days else None
-    from config import Config
-    return custom or Config.DEFAULT_REMINDER_OFFSETS
+    return render_reminder(schedule, due_date, offset_days)
 
+def build_digest_content(items):
+    """One combined email for several (schedule, due, offset) items that go
+    to the same recipients."""
+    return render_digest(items)
 
-def scan_missed_reminders(days: int | None = None):
-    """Backfill reminders that should have been sent in the past N days."""
-    tz = pytz.timezone(Config.APP_TZ)
-    today = datetime.now(tz).date()
-    lookback = days or getattr(Config, "MISSED_SCAN_DAYS", 7)
-    window_start = today - timedelta(days=lookback)
+# error_message of a reminder that was not sent because its schedule has no
+# valid "to" address left.
+NO_RECIPIENTS_ERROR = "No valid recipient address"
 
-    with current_app.app_context():
-        schedules = Schedule.query.filter_by(active=True).all()
-        for sch in schedules:
-            offsets = _get_offsets(sch)
-            if not offsets:
+_SCHEDULE_COLUMNS = (
+    Schedule.id,
+    Schedule.entity_name,
+    Schedule.report_name,
+    Schedule.description,
+    Schedule.anchor_due_date,
+    Schedule.interval_months,
+    Schedule.updated_at,
+)
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _claim_statement():
+    """INSERT ... ON CONFLICT DO NOTHING against the claimed-key unique index,
+    returning only the rows this run actually inserted."""
+    return insert_or_ignore(
+        ReminderLog,
+        "schedule_id", "planned_due_date", "reminder_offset_days",
+        index_where=CLAIMED_KEY_WHERE,
+    ).returning(
+        ReminderLog.id,
+        ReminderLog.schedule_id,
+        ReminderLog.planned_due_date,
+        ReminderLog.reminder_offset_days,
+    )
+
+
+def _enqueue_planned(candidate_chunks, on_chunk=None):
+    """Claim the planned (schedule, due, offset) candidates as SENDING rows
+    with an insert-or-ignore and queue a rendered message for each key this
+    run won, one chunk per transaction. A key that is already SENT (or being
+    sent) is skipped by the database, not by a read-then-write check. The
+    outbox worker records the delivery outcome. `candidate_chunks` yields
+    lists of (schedule, due, offset, backfilled) tuples; each chunk's
+    recipients are read in one query, and the session is expunged after
+    each chunk so a long run does not accumulate state. Candidates whose
+    schedule has no valid "to" address are recorded SKIPPED (see
+    `_skip_unsendable`) instead of claimed. `on_chunk(candidates,
+    queued, skipped)` is called once a non-empty chunk is committed.
+
+    DIGEST_MODE is the exception: a recipient group can span the whole
+    window, so the candidates of the pass (one zone) are gathered into a
+    single chunk before grouping, and memory grows with the reminders
+    pending in that zone's window."""
+    if Config.DIGEST_MODE:
+        candidate_chunks = [[c for chunk in candidate_chunks for c in chunk]]
+
+    with metrics.PHASE_SECONDS.time(phase="enqueue"):
+        for candidates in candidate_chunks:
+            if not candidates:
                 continue
-            max_off = max(offsets)
-            due_start = window_start
-            due_end = today + timedelta(days=max_off)
-            dues = generate_upcoming_occurrences(
-                sch.anchor_due_date, sch.interval_months, due_start, due_end
-            )
-            for due in dues:
-                for off in offsets:
-                    send_day = due - timedelta(days=off)
-                    if send_day < window_start or send_day > today:
-                        continue
-                    exists = ReminderLog.query.filter_by(
-                        schedule_id=sch.id,
-                        planned_due_date=due,
-                        reminder_offset_days=off,
-                        status="SENT",
-                    ).first()
-                    if exists:
-                        continue
-
-                    to_emails = parse_csv_emails(sch.recipient_emails)
-                    cc_emails = parse_csv_emails(sch.cc_emails or "")
-                    subject, html, text = build_email_content(sch, due, off)
-                    ok, err = send_email([], cc_emails, subject, html, text, bcc_emails=to_emails)
-
-                    log = ReminderLog(
-                        schedule_id=sch.id,
-                        planned_due_date=due,
-                        reminder_offset_days=off,
-                        status="SENT" if ok else "FAILED",
-                        error_message=None if ok else str(err),
-                        backfilled=True,
-                        retry_count=0,
-                    )
-                    db.session.add(log)
-                    db.session.commit()
+            by_key = {}
+            backfilled = {}
+            for sch, due, off, is_backfill in candidates:
+                by_key.setdefault((sch.id, due, off), sch)
+                backfilled[(sch.id, due, off)] = is_backfill
+            recipients = recipients_for({sid for sid, _, _ in by_key})
+            metrics.SCHEDULES_SCANNED.inc(len(recipients))
+            unsendable = [key for key in by_key if not recipients[key[0]].to]
+            if unsendable:
+                _skip_unsendable(unsendable, backfilled)
+                for key in unsendable:
+                    del by_key[key]
+            queued, skipped = 0, len(unsendable)
+            for chunk in _key_chunks(by_key, recipients):
+                n = _claim_and_queue(chunk, by_key, backfilled, recipients)
+                queued += n
+                skipped += len(chunk) - n
+            db.session.expunge_all()
+            if on_chunk:
+                on_chunk(candidates, queued, skipped)
+
+
+def _skip_unsendable(keys, backfilled):
+    """Record candidate keys whose schedule has no valid "to" address as
+    SKIPPED logs carrying the reason, and mark their plan rows SKIPPED, so
+    nothing is rendered or queued for them and they are not picked up
+    again. SKIPPED is not a claimed status: once the addresses are fixed,
+    the schedule's next reminders go out normally."""
+    now = datetime.utcnow()
+    db.session.execute(insert(ReminderLog), [
+        dict(
+            schedule_id=sid,
+            planned_due_date=due,
+            reminder_offset_days=off,
+            status="SKIPPED",
+            error_message=NO_RECIPIENTS_ERROR,
+            sent_at=now,
+            backfilled=backfilled[(sid, due, off)],
+            retry_count=0,
+        )
+        for sid, due, off in keys
+    ])
+    mark_planned({key: "SKIPPED" for key in keys})
+    db.session.commit()
+    metrics.CANDIDATES.inc(len(keys), outcome="no_recipients")
+    current_app.logger.warning("Skipped %d reminder(s) of schedules without a valid recipient address", len(keys))
+
+
+def _claim_and_queue(chunk, by_key, backfilled, recipients):
+    now = datetime.utcnow()
+    claimed = db.session.execute(_claim_statement(), [
+        dict(
+            schedule_id=sid,
+            planned_due_date=due,
+            reminder_offset_days=off,
+            status="SENDING",
+            sent_at=now,
+            backfilled=backfilled[(sid, due, off)],
+            retry_count=0,
+        )
+        for sid, due, off in chunk
+    ]).all()
+
+    # Keys another pass already owns are skipped, not resent.
+    statuses = {key: "SKIPPED" for key in chunk}
+    for _, sid, due, off in claimed:
+        statuses[(sid, due, off)] = "QUEUED"
+    metrics.CANDIDATES.inc(len(claimed), outcome="queued")
+    metrics.CANDIDATES.inc(len(chunk) - len(claimed), outcome="skipped")
+    enqueue(*_messages([
+        (log_id, by_key[(sid, due, off)], due, off) for log_id, sid, due, off in claimed
+    ], recipients))
+    mark_planned(statuses)
+    db.session.commit()
+    return len(claimed)
+
+
+def _recipient_group(rcpt):
+    return tuple(sorted(rcpt.to)), tuple(sorted(rcpt.cc))
+
+
+def _key_chunks(by_key, recipients):
+    """Split claim keys into per-transaction chunks. In digest mode keys are
+    ordered by recipient group and a group is never split across chunks, so
+    each group still becomes a single message."""
+    keys = list(by_key)
+    if not Config.DIGEST_MODE:
+        yield from _chunks(keys, Config.LOG_WRITE_CHUNK_SIZE)
+        return
+    groups = {}
+    for key in keys:
+        groups.setdefault(_recipient_group(recipients[key[0]]), []).append(key)
+    chunk = []
+    for group_keys in groups.values():
+        if chunk and len(chunk) + len(group_keys) > Config.LOG_WRITE_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+        chunk.extend(group_keys)
+    if chunk:
+        yield chunk
+
+
+def _messages(items, recipients):
+    """Rendered messages for claimed [(log_id, schedule, due, offset)] items,
+    paired with the log ids each one carries (the arguments of enqueue()).
+    `recipients` maps schedule ids to their Recipients. Without DIGEST_MODE
+    that is one message per item; with it, one per recipient group, the
+    group's logs all pointing at the same message."""
+    if not Config.DIGEST_MODE:
+        return ([_outgoing(log_id, sch, due, off, recipients[sch.id]) for log_id, sch, due, off in items],
+                [[item[0]] for item in items])
+    groups = {}
+    for item in items:
+        groups.setdefault(_recipient_group(recipients[item[1].id]), []).append(item)
+    emails = []
+    log_ids = []
+    for group in groups.values():
+        rcpt = recipients[group[0][1].id]
+        if len(group) == 1:
+            emails.append(_outgoing(*group[0], rcpt))
+        else:
+            emails.append(_digest_outgoing(group, rcpt))
+        log_ids.append([log_id for log_id, _, _, _ in group])
+    return emails, log_ids
+
+
+def _digest_outgoing(group, rcpt) -> OutgoingEmail:
+    subject, html, text = build_digest_content([(s, due, off) for _, s, due, off in group])
+    return OutgoingEmail(
+        ref=group[0][0],
+        to_emails=[],
+        cc_emails=rcpt.cc,
+        bcc_emails=rcpt.to,
+        subject=subject,
+        html=html,
+        text=text,
+    )
+
+
+def _outgoing(ref, sch, due: date, off: int, rcpt) -> OutgoingEmail:
+    subject, html, text = build_email_content(sch, due, off)
+    return OutgoingEmail(
+        ref=ref,
+        to_emails=[],
+        cc_emails=rcpt.cc,
+        bcc_emails=rcpt.to,
+        subject=subject,
+        html=html,
+        text=text,
+    )
+
+
+def _release_stale_claims():
+    """SENDING rows without an outbox message, older than the claim timeout,
+    were claimed by a run that died before queueing them (or by a version
+    that sent inline). Mark them FAILED, due now, so the retry job picks them up.
+    Queued rows are covered by the outbox lease instead."""
+    cutoff = datetime.utcnow() - timedelta(minutes=Config.SEND_CLAIM_TIMEOUT_MINUTES)
+    db.session.execute(
+        update(ReminderLog)
+        .where(
+            ReminderLog.status == "SENDING",
+            ReminderLog.outbox_id.is_(None),
+            ReminderLog.sent_at < cutoff,
+        )
+        .values(status="FAILED", error_message="Interrupted before delivery was confirmed",
+                next_attempt_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _supersede_failed_logs():
+    """A FAILED log whose key has since been sent by another pass (e.g. the
+    backfill) must not be retried; flipping it to SENT would also violate
+    the claimed-key index."""
+    sibling = aliased(ReminderLog)
+    db.session.execute(
+        update(ReminderLog)
+        .where(
+            ReminderLog.status == "FAILED",
+            exists().where(
+                sibling.schedule_id == ReminderLog.schedule_id,
+                sibling.planned_due_date == ReminderLog.planned_due_date,
+                sibling.reminder_offset_days == ReminderLog.reminder_offset_days,
+                sibling.status.in_(CLAIMED_STATUSES),
+            ),
+        )
+        .values(status="SUPERSEDED")
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def _planned_candidates(start: date, end: date, today: date, tz: str, offsets=None, after: int | None = None):
+    """Pending plan rows of schedules in zone `tz` with a send date in
+    [start, end], joined with the schedule columns needed to render them, as
+    chunks of column rows read in plan-id order (see keyset_chunks), starting
+    after plan id `after` if given. Rows whose send date is before `today`
+    are backfills."""
+    query = (
+        db.session.query(*_SCHEDULE_COLUMNS, PlannedReminder.id.label("plan_id"), PlannedReminder.due_date,
+                         PlannedReminder.offset_days, PlannedReminder.send_date)
+        .join(Schedule, PlannedReminder.schedule_id == Schedule.id)
+        .filter(
+            PlannedReminder.send_date.between(start, end),
+            PlannedReminder.status == "PENDING",
+            Schedule.active.is_(True),
+            zone_filter(tz),
+        )
+    )
+    if offsets is not None:
+        query = query.filter(PlannedReminder.offset_days.in_(offsets))
+    for rows in keyset_chunks(query, PlannedReminder.id, Config.LOG_WRITE_CHUNK_SIZE, key="plan_id", after=after):
+        yield [(row, row.due_date, row.offset_days, row.send_date < today) for row in rows]
+
 
-def scan_and_send_reminders():
-    tz = pytz.timezone(Config.APP_TZ)
-    today = datetime.now(tz).date()
+def run_reminders(back_days: int = 0, offsets=None, retries: bool = True, timezones=None,
+                  job: str = "run_reminders"):
+    """The reminder engine. Every entry point is a window over it: make sure
+    the plan is current, then, per timezone, claim and queue all pending
+    reminders whose send date falls between `back_days` before that zone's
+    today and today (H-n, H and H+n alike) in a single pass, and optionally
+    re-queue retries that have come due. Dedup is the same claim on every
+    path. `timezones` limits the run to schedules in those zones.
 
+    The run is recorded in job_runs as `job`, with a checkpoint after every
+    committed chunk; if the last run of `job` over the same window died, this
+    one continues from its checkpoint (see runs.py)."""
+    # Each zone's date is read once, so a run crossing midnight stays consistent.
+    todays = {tz: local_today(tz) for tz in (timezones or schedule_timezones())}
+    plan_today = min(todays.values())
     with current_app.app_context():
-        schedules = Schedule.query.filter_by(active=True).all()
-        for sch in schedules:
-            offsets = _get_offsets(sch)
-            # Determine the relevant due date for which today could match any offset:
-            # We need to check the 'current' or 'next' due date and maybe a few future ones.
-            # Strategy: start from the next occurrence >= (today), but also check if today matches offsets for that due and possibly the immediate next due.
-            # Also check if today matches offsets for a past due if offset was negative (e.g., escalation H+1). For MVP, we only consider non-negative offsets.
-            due = next_occurrence(sch.anchor_due_date, sch.interval_months, today)
-            candidate_dues = set()
-            if due:
-                candidate_dues.add(due)
-            # Also consider previous occurrence in case today is H-0 for a due that equals today (already included), or H-1 for due==tomorrow is handled above.
-            # Compute previous by subtracting interval once
-            if sch.interval_months > 0:
-                prev = sch.anchor_due_date
-                while True:
-                    nxt = prev  # keep track
-                    nextc = prev
-                    # we will move forward until nextc >= due (or today)
-                    if prev >= today:
-                        break
-                    # advance
-                    adv = nextc
-                    from dateutil.relativedelta import relativedelta
-                    adv = prev + relativedelta(months=sch.interval_months)
-                    if adv >= today:
-                        # prev is the previous occurrence before today
-                        candidate_dues.add(adv)  # also check adv itself (next due)
-                        candidate_dues.add(prev) # previous due in case of H+ escalation
-                        break
-                    prev = adv
-
-            for d in list(candidate_dues):
-                matches = should_send_for_due(d, today, offsets)
-                for off in matches:
-                    # Dedup: has a SENT log today for this schedule/due/off?
-                    exists = ReminderLog.query.filter_by(
-                        schedule_id=sch.id,
-                        planned_due_date=d,
-                        reminder_offset_days=off,
-                        status="SENT",
-                    ).filter(ReminderLog.sent_at >= datetime.combine(today, datetime.min.time())).first()
-                    if exists:
-                        continue
-
-                    to_emails = parse_csv_emails(sch.recipient_emails)
-                    cc_emails = parse_csv_emails(sch.cc_emails or "")
-                    subject, html, text = build_email_content(sch, d, off)
-                    ok, err = send_email([], cc_emails, subject, html, text, bcc_emails=to_emails)
-
-                    log = ReminderLog(
-                        schedule_id=sch.id,
-                        planned_due_date=d,
-                        reminder_offset_days=off,
-                        status="SENT" if ok else "FAILED",
-                        error_message=None if ok else str(err),
-                        retry_count=0,
-                    )
-                    db.session.add(log)
+        run = start_run(
+            job, dict(back_days=back_days, offsets=offsets, retries=retries, todays=todays),
+            plan_today - timedelta(days=back_days), max(todays.values()),
+        )
+        try:
+            with metrics.PHASE_SECONDS.time(phase="plan"):
+                extend_plan(plan_today)
+                advance_next_dues()
+                if back_days > Config.MISSED_SCAN_DAYS:
+                    # Older than the plan's usual back window: plan those days first.
+                    fill_plan(plan_today - timedelta(days=back_days), plan_today)
                     db.session.commit()
+            unlisted = unlisted_zones()
+            if unlisted:
+                current_app.logger.warning(
+                    "Schedules in zones missing from SCHEDULE_TIMEZONES are run in %s: %s", Config.APP_TZ,
+                    ", ".join(f"{tz} ({n})" for tz, n in sorted(unlisted.items())))
+            zones = list(todays)
+            if run.cursor_zone in todays:
+                # Zones before the checkpoint's were finished by the run that died
+                zones = zones[zones.index(run.cursor_zone):]
+            for tz in zones:
+                today = todays[tz]
+                after = run.cursor_id if tz == run.cursor_zone else None
+                _enqueue_planned(
+                    _planned_candidates(today - timedelta(days=back_days), today, today, tz, offsets, after),
+                    partial(_checkpoint, run.id, tz),
+                )
+            if retries:
+                # Retries that came due in the meantime; the retry job handles the rest
+                retry_failed_reminders()
+        except Exception as e:
+            finish_run(run.id, error=f"{type(e).__name__}: {e}")
+            raise
+        finish_run(run.id)
+
+
+def _checkpoint(run_id, tz, candidates, queued, skipped):
+    # Every candidate of the chunk has been claimed or skipped by now
+    checkpoint(run_id, tz, max(sch.plan_id for sch, _, _, _ in candidates), len(candidates), queued, skipped)
 
-        # Retry failed reminders with exponential backoff
-        now = datetime.utcnow()
-        failed_logs = ReminderLog.query.filter_by(status="FAILED").all()
-        for log in failed_logs:
-            if log.retry_count >= Config.MAX_RETRY_ATTEMPTS:
-                continue
-            delay = Config.RETRY_BACKOFF_BASE_MINUTES * (2 ** log.retry_count)
-            if log.sent_at + timedelta(minutes=delay) > now:
-                continue
 
-            sch = log.schedule
-            to_emails = parse_csv_emails(sch.recipient_emails)
-            cc_emails = parse_csv_emails(sch.cc_emails or "")
-            subject, html, text = build_email_content(
-                sch, log.planned_due_date, log.reminder_offset_days
+@metrics.timed_job("scan_missed_reminders")
+def scan_missed_reminders(days: int | None = None):
+    """Backfill reminders that should have been sent in the past N days."""
+    run_reminders(days or Config.MISSED_SCAN_DAYS, retries=False, job="scan_missed_reminders")
+
+@metrics.timed_job("scan_and_send_reminders")
+def scan_and_send_reminders(timezones=None):
+    """The daily job: today's reminders plus due retries. The scheduler runs
+    it once per zone, at that zone's local send time."""
+    run_reminders(timezones=timezones, job="scan_and_send_reminders")
+
+@metrics.timed_job("retry_failed_reminders")
+def retry_failed_reminders():
+    """Re-queue FAILED reminders whose next_attempt_at has come. Each chunk
+    is one indexed range query on (status, next_attempt_at); rows that are
+    not due yet, or are DEAD, are never read."""
+    with current_app.app_context():
+        _release_stale_claims()
+        _supersede_failed_logs()
+        now = datetime.utcnow()
+        while True:
+            due = (
+                db.session.query(
+                    ReminderLog.id.label("log_id"),
+                    ReminderLog.planned_due_date,
+                    ReminderLog.reminder_offset_days,
+                    ReminderLog.retry_count,
+                    *_SCHEDULE_COLUMNS,
+                )
+                .join(Schedule, ReminderLog.schedule_id == Schedule.id)
+                .filter(ReminderLog.status == "FAILED", ReminderLog.next_attempt_at <= now)
+                .order_by(ReminderLog.next_attempt_at)
+                .limit(Config.LOG_WRITE_CHUNK_SIZE)
+                .all()
             )
-            ok, err = send_email([], cc_emails, subject, html, text, bcc_emails=to_emails)
-
-            log.retry_count += 1
-            log.sent_at = datetime.utcnow()
-            if ok:
-                log.status = "SENT"
-                log.error_message = None
-            else:
-                log.error_message = str(err)
+            if not due:
+                break
+            retries = [log for log in due if log.retry_count < Config.MAX_RETRY_ATTEMPTS]
+            recipients = recipients_for({log.id for log in retries})
+            retries = [log for log in retries if recipients[log.id].to]
+            enqueue(*_messages([(log.log_id, log, log.planned_due_date, log.reminder_offset_days) for log in retries],
+                               recipients))
+            db.session.execute(update(ReminderLog), [
+                dict(id=log.log_id, status="DEAD", next_attempt_at=None)
+                if log.retry_count >= Config.MAX_RETRY_ATTEMPTS else
+                dict(id=log.log_id, status="SKIPPED", error_message=NO_RECIPIENTS_ERROR, next_attempt_at=None)
+                if not recipients[log.id].to else
+                dict(id=log.log_id, status="SENDING", retry_count=log.retry_count + 1,
+                     sent_at=now, next_attempt_at=None)
+                for log in due
+            ])
             db.session.commit()
+            db.session.expunge_all()
 
+@metrics.timed_job("send_today_due_reminders")
 def send_today_due_reminders():
     """Send H reminders for schedules whose due date is today."""
-    tz = pytz.timezone(Config.APP_TZ)
-    today = datetime.now(tz).date()
+    run_reminders(offsets=(0,), retries=False, job="send_today_due_reminders")
 
+@metrics.timed_job("archive_logs")
+def archive_old_logs():
+    """Move reminder logs past LOG_RETENTION_DAYS to the monthly archive."""
     with current_app.app_context():
-        schedules = Schedule.query.filter_by(active=True).all()
-        for sch in schedules:
-            due = next_occurrence(sch.anchor_due_date, sch.interval_months, today)
-            if due != today:
-                continue
+        result = archive_logs()
+        if result.archived:
+            current_app.logger.info("Archived %d reminder log(s) into %s", result.archived, ", ".join(result.months))
+        if result.plans_pruned:
+            current_app.logger.info("Pruned %d old planned reminder(s)", result.plans_pruned)
 
-            # Skip if already logged today
-            exists = (
-                ReminderLog.query.filter_by(
-                    schedule_id=sch.id,
-                    planned_due_date=due,
-                    reminder_offset_days=0,
-                    status="SENT",
-                )
-                .filter(
-                    ReminderLog.sent_at
-                    >= datetime.combine(today, datetime.min.time())
-                )
-                .first()
-            )
-            if exists:
-                continue
+@metrics.timed_job("drain_outbox")
+def drain_outbox():
+    """Send whatever is queued from inside this process."""
+    with current_app.app_context():
+        try:
+            drain()
+        finally:
+            close_smtp_pool()
 
-            to_emails = parse_csv_emails(sch.recipient_emails)
-            cc_emails = parse_csv_emails(sch.cc_emails or "")
-            subject, html, text = build_email_content(sch, due, 0)
-            ok, err = send_email([], cc_emails, subject, html, text, bcc_emails=to_emails)
-
-            log = ReminderLog(
-                schedule_id=sch.id,
-                planned_due_date=due,
-                reminder_offset_days=0,
-                status="SENT" if ok else "FAILED",
-                error_message=None if ok else str(err),
-                retry_count=0,
-            )
-            db.session.add(log)
-            db.session.commit()
+def _in_app_context(app, fn):
+    # APScheduler runs jobs on its own threads, where no app context exists.
+    with app.app_context():
+        fn()
+
+def _leader_only(app, lease, fn):
+    """Run `fn` only in the process holding the scheduler lease. Only the
+    heartbeat job acquires the lease, so a takeover always goes through
+    _heartbeat and queues its catch-up."""
+    with app.app_context():
+        if lease.holds():
+            fn()
+
+@metrics.timed_job("catch_up")
+def catch_up():
+    """Today's reminders, the missed-reminder backfill and due retries, as
+    one pass over the whole back window."""
+    run_reminders(Config.MISSED_SCAN_DAYS, job="catch_up")
+
+def _tracked_catch_up(app):
+    """catch_up() with its progress recorded for the readiness endpoint."""
+    status = app.extensions["startup_status"]
+    status.update(catch_up="running", catch_up_started_at=datetime.utcnow(), catch_up_error=None)
+    try:
+        catch_up()
+        status["catch_up"] = "done"
+    except Exception as e:
+        # The run and its checkpoint are in job_runs; the next catch-up resumes from it
+        app.logger.warning(f"Initial scan failed: {e}")
+        status.update(catch_up="failed", catch_up_error=str(e))
+    finally:
+        status["catch_up_finished_at"] = datetime.utcnow()
+
+def _heartbeat(app, lease, scheduler, catch_up_on_win: bool = True):
+    with app.app_context():
+        won = lease.heartbeat()
+        app.extensions["startup_status"]["scheduler"] = "leader" if lease.is_leader else "standby"
+        if won and catch_up_on_win:
+            # Newly elected (startup or failover): catch up on whatever was
+            # missed, off the heartbeat thread so renewals keep flowing.
+            scheduler.add_job(_leader_only, args=[app, lease, lambda: _tracked_catch_up(app)],
+                              id="leader_catch_up", replace_existing=True)
 
 def init_scheduler(app):
-    scheduler = BackgroundScheduler(timezone=Config.APP_TZ)
-    # Daily job at configured hour/minute
-    trigger = CronTrigger(hour=Config.DAILY_JOB_HOUR, minute=Config.DAILY_JOB_MINUTE)
-    scheduler.add_job(scan_and_send_reminders, trigger, id="daily_reminders", replace_existing=True)
+    """Start the background scheduler. Returns immediately: the first lease
+    heartbeat and the startup catch-up run as jobs on the scheduler's
+    threads, and report progress through app.extensions["startup_status"]."""
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    lease = LeaderLease()
+    app.extensions["scheduler_lease"] = lease
+    status = app.extensions.setdefault("startup_status", {})
+    status.update(scheduler="starting", catch_up="pending" if Config.STARTUP_CATCH_UP else "disabled")
+
+    scheduler = BackgroundScheduler(timezone=get_tz())
+    # Daily job per timezone, at the configured hour/minute in that zone
+    for tz in schedule_timezones():
+        trigger = CronTrigger(hour=Config.DAILY_JOB_HOUR, minute=Config.DAILY_JOB_MINUTE, timezone=get_tz(tz))
+        scheduler.add_job(_leader_only, trigger, args=[app, lease, partial(scan_and_send_reminders, [tz])],
+                          id=f"daily_reminders:{tz}", replace_existing=True)
+    # First heartbeat right away; winning it also queues the catch-up scans
+    scheduler.add_job(_heartbeat, "interval", args=[app, lease, scheduler, Config.STARTUP_CATCH_UP],
+                      seconds=Config.LEADER_HEARTBEAT_SECONDS, id="leader_heartbeat",
+                      next_run_time=datetime.now(get_tz()),
+                      replace_existing=True, max_instances=1, coalesce=True)
+    if Config.LOG_RETENTION_DAYS > 0:
+        scheduler.add_job(_leader_only, CronTrigger(hour=Config.RETENTION_JOB_HOUR, minute=0),
+                          args=[app, lease, archive_old_logs], id="archive_logs", replace_existing=True)
+    # Retries fire on their own backoff, not at the next daily run
+    scheduler.add_job(_leader_only, "interval", args=[app, lease, retry_failed_reminders],
+                      seconds=Config.RETRY_POLL_SECONDS, id="retry_failed",
+                      replace_existing=True, max_instances=1, coalesce=True)
+    if Config.OUTBOX_EMBEDDED_WORKER:
+        # Outbox claims are leased per row, so every process may drain.
+        scheduler.add_job(_in_app_context, "interval", args=[app, drain_outbox],
+                          seconds=Config.OUTBOX_POLL_SECONDS, id="outbox_drain",
+                          replace_existing=True, max_instances=1, coalesce=True)
     scheduler.start()
-    # Also run once at startup (useful for dev/demo)
-    with app.app_context():
-        try:
-            scan_and_send_reminders()
-            scan_missed_reminders()
-        except Exception as e:
-            app.logger.warning(f"Initial scan failed: {e}")
+    app.extensions["scheduler"] = scheduler
+    atexit.register(_in_app_context, app, lease.release)
     # Just log immediately that scheduler is running
-    app.logger.info("Scheduler is running (daily at %02d:%02d %s).",
-                    Config.DAILY_JOB_HOUR, Config.DAILY_JOB_MINUTE, Config.APP_TZ)
-
+    app.logger.info("Scheduler is running (daily at %02d:%02d local time in %s).",
+                    Config.DAILY_JOB_HOUR, Config.DAILY_JOB_MINUTE, ", ".join(schedule_timezones()))
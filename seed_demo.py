@@ -1,7 +1,10 @@
-from app import app
+from app import create_app
 from models import db, Schedule
+from recipients import sync_schedule
 from datetime import date
 
+app = create_app()
+
 with app.app_context():
     db.drop_all()
     db.create_all()
@@ -45,5 +48,6 @@ with app.app_context():
     for d in demo:
         s = Schedule(**d)
         db.session.add(s)
+        sync_schedule(s)
     db.session.commit()
     print("Seeded demo data.")
@@ -1,5 +1,8 @@
+import random
+import re
 from datetime import date, timedelta
-from dateutil.relativedelta import relativedelta
+
+EMAIL_RE = re.compile(r"^[^@\s,;]+@[^@\s,;]+\.[^@\s,;]+$")
 
 def parse_csv_emails(csv_text: str):
     if not csv_text:
@@ -20,40 +23,85 @@ def parse_offsets(text: str):
             continue
     return sorted(set(out), reverse=True)  # highest first for clarity
 
+def normalize_recipients(to_text: str, cc_text: str | None = None):
+    """(email, role, valid) for the addresses of a schedule: trimmed,
+    lowercased and deduplicated; an address in both lists stays "to"."""
+    out = {}
+    for role, text in (("to", to_text), ("cc", cc_text)):
+        for email in parse_csv_emails(text or ""):
+            out.setdefault(email.lower(), role)
+    return [(email, role, bool(EMAIL_RE.match(email))) for email, role in out.items()]
+
+def occurrence_at(anchor: date, interval_months: int, index: int) -> date:
+    """Return the index-th due date (0 = anchor).
+
+    Always computed from the anchor in one step, so month-end anchors clamp
+    per month (Jan 31 -> Feb 28/29 -> Mar 31) instead of drifting the way
+    chained additions do (Jan 31 -> Feb 28 -> Mar 28).
+    """
+    from dateutil.relativedelta import relativedelta  # deferred: keeps app import light
+
+    return anchor + relativedelta(months=index * interval_months)
+
+def _next_index(anchor: date, interval_months: int, ref: date) -> int:
+    """Index of the first occurrence >= ref (interval_months > 0)."""
+    if anchor >= ref:
+        return 0
+    months_diff = (ref.year - anchor.year) * 12 + (ref.month - anchor.month)
+    index = months_diff // interval_months
+    # occurrence_at(index) falls in ref's month or earlier; the next one is
+    # always in a later month, so at most one step forward is needed.
+    if occurrence_at(anchor, interval_months, index) < ref:
+        index += 1
+    return index
+
 def next_occurrence(anchor: date, interval_months: int, ref: date) -> date:
     """Return the next due date >= ref based on an anchor date and interval in months.
     interval_months == 0 means one-off; returns anchor if anchor >= ref else None.
     """
     if interval_months == 0:
         return anchor if anchor >= ref else None
+    return occurrence_at(anchor, interval_months, _next_index(anchor, interval_months, ref))
 
-    # Step forward in month increments until >= ref
-    due = anchor
-    if due >= ref:
-        return due
-
-    # Calculate rough number of intervals to jump
-    # months_diff = (ref.year - anchor.year) * 12 + (ref.month - anchor.month)
-    # intervals_to_add = (months_diff // interval_months)
-    # due = anchor + relativedelta(months=intervals_to_add * interval_months)
-
-    # Simpler but safe loop (intervals typically small)
-    while due < ref:
-        due = due + relativedelta(months=interval_months)
-    return due
-
-def generate_upcoming_occurrences(anchor: date, interval_months: int, start: date, end: date, max_count: int = 24):
-    """Generate due dates within [start, end], up to max_count occurrences."""
+def previous_occurrence(anchor: date, interval_months: int, ref: date) -> date:
+    """Return the last due date < ref, or None if the schedule starts at/after ref."""
     if interval_months == 0:
-        if anchor >= start and anchor <= end:
-            return [anchor]
-        return []
+        return anchor if anchor < ref else None
+    index = _next_index(anchor, interval_months, ref) - 1
+    if index < 0:
+        return None
+    return occurrence_at(anchor, interval_months, index)
 
+def occurrences_between(anchor: date, interval_months: int, start: date, end: date, max_count: int | None = None):
+    """Return the due dates within [start, end], oldest first."""
+    if interval_months == 0:
+        return [anchor] if start <= anchor <= end else []
     out = []
-    due = next_occurrence(anchor, interval_months, start)
-    while due and due <= end and len(out) < max_count:
+    index = _next_index(anchor, interval_months, start)
+    due = occurrence_at(anchor, interval_months, index)
+    while due <= end and (max_count is None or len(out) < max_count):
         out.append(due)
-        due = due + relativedelta(months=interval_months)
+        index += 1
+        due = occurrence_at(anchor, interval_months, index)
+    return out
+
+def send_dates_between(anchor: date, interval_months: int, offsets, start: date, end: date):
+    """(due, offset, send date) of every reminder whose send date lies within
+    [start, end], oldest due first."""
+    if not offsets:
+        return []
+    dues = occurrences_between(
+        anchor,
+        interval_months,
+        start + timedelta(days=min(offsets)),
+        end + timedelta(days=max(offsets)),
+    )
+    out = []
+    for due in dues:
+        for off in offsets:
+            send_date = due - timedelta(days=off)
+            if start <= send_date <= end:
+                out.append((due, off, send_date))
     return out
 
 def should_send_for_due(due: date, today: date, offsets: list[int]) -> list[int]:
@@ -63,3 +111,11 @@ def should_send_for_due(due: date, today: date, offsets: list[int]) -> list[int]
         if due - timedelta(days=off) == today:
             matches.append(off)
     return matches
+
+def retry_backoff(retry_count: int, base_minutes: int, jitter: float = 0.0) -> timedelta:
+    """Exponential backoff before retry number `retry_count + 1`, spread by
+    +/- `jitter` (a fraction) so failures from one outage do not retry in lockstep."""
+    minutes = base_minutes * (2 ** retry_count)
+    if jitter:
+        minutes *= random.uniform(1 - jitter, 1 + jitter)
+    return timedelta(minutes=minutes)
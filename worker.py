@@ -0,0 +1,50 @@
+"""Standalone outbox worker.
+
+    python -m worker              # poll forever
+    python -m worker --once       # drain what is queued, then exit
+
+Run as many as needed, on one host or several: rows are claimed with a
+lease, so workers never send the same message concurrently, and a message
+whose worker died is picked up again once its lease expires.
+"""
+import argparse
+import logging
+import time
+
+from app import create_app
+from config import Config
+from mailer import close_smtp_pool
+from outbox import default_worker_id, drain
+
+
+def run(once: bool = False, worker_id: str | None = None, poll_seconds: float | None = None):
+    app = create_app()
+    worker_id = worker_id or default_worker_id()
+    poll_seconds = poll_seconds if poll_seconds is not None else Config.OUTBOX_POLL_SECONDS
+    logging.info("Outbox worker %s started", worker_id)
+    with app.app_context():
+        try:
+            while True:
+                sent = drain(worker_id)
+                if sent:
+                    logging.info("Worker %s processed %d message(s)", worker_id, sent)
+                if once:
+                    return
+                close_smtp_pool()
+                time.sleep(poll_seconds)
+        finally:
+            close_smtp_pool()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Send queued reminder emails from the outbox.")
+    ap.add_argument("--once", action="store_true", help="drain the outbox once and exit")
+    ap.add_argument("--worker-id", help="lease owner name (default: host:pid)")
+    ap.add_argument("--poll", type=float, help="seconds between polls when idle")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    run(once=args.once, worker_id=args.worker_id, poll_seconds=args.poll)
+
+
+if __name__ == "__main__":
+    main()